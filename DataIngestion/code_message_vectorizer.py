@@ -1,13 +1,20 @@
 # DataIngestion/code_message_vectorizer.py
+import hashlib
 from pathlib import Path
-from typing import Dict, Union, List
+from typing import Dict, Union, List, Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from DataIngestion.embedding_backends import EmbeddingBackend, get_backend
+from DataIngestion.embedding_store import EmbeddingStore
 
 
 class CodeMessageVectorizer:
-    def __init__(self, model_name: str = "all-mpnet-base-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = "all-mpnet-base-v2", backend: Union[str, EmbeddingBackend, None] = None,
+                 num_threads: Optional[int] = None):
+        if isinstance(backend, EmbeddingBackend):
+            self.model = backend
+        else:
+            self.model = get_backend(backend, model_name=model_name, num_threads=num_threads)
+        self.dimension = self.model.dimension
         self.chunk_size = 512  # tokens
 
     def _chunk_text(self, text: str) -> List[str]:
@@ -32,15 +39,86 @@ class CodeMessageVectorizer:
                     continue  # Skip binary files
         return vectors
 
+    def vectorize_codebase_to_store(self, repo_path: str, store_path: str, previous: Optional[EmbeddingStore] = None) -> EmbeddingStore:
+        """Stream code chunk vectors into an on-disk store, one file at a time.
+
+        With a `previous` store, files whose content digest is unchanged reuse
+        their old vectors instead of being encoded again.
+        """
+        store = EmbeddingStore.create(store_path, self.dimension)
+        previous_rows = {}
+        if previous is not None:
+            for row, meta in enumerate(previous.metadata()):
+                previous_rows.setdefault((meta.get('file_path'), meta.get('digest')), []).append(row)
+
+        # Sorted paths keep each directory in one contiguous block of rows, so range shards follow directories
+        code_files = sorted(Path(repo_path).rglob('*.*'))
+        for i, file_path in enumerate(code_files):
+            if file_path.is_file() and not file_path.name.startswith('.'):
+                try:
+                    with open(file_path, 'r') as f:
+                        content = f.read()
+                except UnicodeDecodeError:
+                    continue  # Skip binary files
+                digest = hashlib.sha1(content.encode('utf-8', 'surrogateescape')).hexdigest()
+                reused = previous_rows.get((str(file_path), digest))
+                if reused:
+                    store.append(previous.vectors()[reused], [str(file_path)] * len(reused), [previous.metadata()[r] for r in reused])
+                    continue
+                print(f"{i} - Vectorizing file:", file_path)
+                chunks = self._chunk_text(content)
+                if chunks:
+                    store.append(self.model.encode(chunks), [str(file_path)] * len(chunks),
+                                 [{'file_path': str(file_path), 'chunk': c, 'digest': digest} for c in range(len(chunks))])
+        return store
+
+    def iter_code_chunks(self, store: EmbeddingStore):
+        """Yield the text of every chunk in a code store, in row order (each file is read once)"""
+        cached_path, chunks = None, []
+        for meta in store.metadata():
+            if meta.get('file_path') != cached_path:
+                cached_path = meta.get('file_path')
+                try:
+                    with open(cached_path, 'r') as f:
+                        chunks = self._chunk_text(f.read())
+                except (OSError, UnicodeDecodeError):
+                    chunks = []
+            chunk = meta.get('chunk', 0)
+            yield chunks[chunk] if chunk < len(chunks) else ""
+
+    def vectorize_commit_messages_to_store(self, commit_hashes: List[str], messages: List[str], store_path: str,
+                                           batch_size: int = 256, previous: Optional[EmbeddingStore] = None) -> EmbeddingStore:
+        """Encode commit messages in batches and append them to an on-disk store (row i = commit i).
+
+        Commits already present in `previous` (matched by hash) reuse their vectors.
+        """
+        store = EmbeddingStore.create(store_path, self.dimension)
+        previous_rows = {h: row for row, h in enumerate(previous.ids())} if previous is not None else {}
+        for start in range(0, len(messages), batch_size):
+            batch_hashes = commit_hashes[start:start + batch_size]
+            vectors = np.empty((len(batch_hashes), self.dimension), dtype=np.float32)
+            missing = [j for j, h in enumerate(batch_hashes) if h not in previous_rows]
+            known = [j for j, h in enumerate(batch_hashes) if h in previous_rows]
+            if known:
+                vectors[known] = previous.vectors()[[previous_rows[batch_hashes[j]] for j in known]]
+            if missing:
+                vectors[missing] = self.model.encode([messages[start + j] for j in missing])
+            store.append(vectors, batch_hashes)
+        return store
+
+    def issues_to_store(self, issues: List[Dict], store_path: str) -> EmbeddingStore:
+        """Move already computed issue vectors into an on-disk store (row i = issue i)"""
+        store = EmbeddingStore.create(store_path, self.dimension)
+        if issues:
+            vectors = np.stack([issue.pop('vector') for issue in issues])
+            store.append(vectors, [str(issue['number']) for issue in issues], [{'number': issue['number'], 'created_at': issue['created_at']} for issue in issues])
+        return store
+
     def vectorize_commit_messages(self, messages: List[str]) -> np.ndarray:
         """Convert commit messages to vectors"""
-        return np.array(self.model.encode(messages)) # Directly return numpy array for messages
+        return self.model.encode(messages) # Backends already return a float32 matrix
 
     def vectorize_issues(self, issues: List[Dict]) -> List[np.ndarray]: # New function to vectorize issues.
         """Vectorize issue titles and bodies."""
-        issue_vectors = []
-        for issue in issues:
-            text_to_vectorize = f"Title: {issue['title']}\nBody: {issue['body']}" # Combine title and body
-            issue_vector = self.model.encode(text_to_vectorize)
-            issue_vectors.append(issue_vector)
-        return issue_vectors
\ No newline at end of file
+        texts = [f"Title: {issue['title']}\nBody: {issue['body']}" for issue in issues] # Combine title and body
+        return list(self.model.encode(texts)) # One batched call instead of one encode per issue
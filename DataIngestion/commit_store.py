@@ -0,0 +1,260 @@
+# DataIngestion/commit_store.py
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+
+class _Interner:
+    """Maps strings to dense int ids; each distinct string is stored once"""
+
+    def __init__(self, values: Sequence[str] = ()):
+        self.values: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for value in values:
+            self.intern(value)
+
+    def intern(self, value: str) -> int:
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+
+class CommitStore:
+    """Columnar, interned commit table built for very long histories.
+
+    Columns (row i = commit i, newest first as produced by iter_commits):
+        hashes          - fixed-width bytes ('S40')
+        author_ids      - int32 ids into `authors`
+        email_ids       - int32 ids into `emails`
+        dates           - int64 epoch seconds
+        message_offsets - int64 CSR offsets into the utf-8 `message_data` buffer
+        file_offsets    - int64 CSR offsets into `file_ids`
+        file_ids        - int32 ids into `paths`
+
+    Every path and author string is stored once. Commits touching a path are
+    found through an inverted path -> rows CSR index built on first use, and
+    date / author filters are plain vectorised comparisons.
+    """
+
+    def __init__(self, hashes: np.ndarray, author_ids: np.ndarray, email_ids: np.ndarray, dates: np.ndarray,
+                 message_offsets: np.ndarray, message_data: bytes, file_offsets: np.ndarray, file_ids: np.ndarray,
+                 authors: List[str], emails: List[str], paths: List[str]):
+        self.hashes = hashes
+        self.author_ids = author_ids
+        self.email_ids = email_ids
+        self.dates = dates
+        self.message_offsets = message_offsets
+        self.message_data = message_data
+        self.file_offsets = file_offsets
+        self.file_ids = file_ids
+        self.authors = authors
+        self.emails = emails
+        self.paths = paths
+        self._rows_by_path = None
+        self._path_ids_by_name = None
+        self._hash_order = None
+
+    # ---- construction -------------------------------------------------
+
+    @classmethod
+    def from_commits(cls, commits: Iterable[Dict], authors: Sequence[str] = (), emails: Sequence[str] = (),
+                     paths: Sequence[str] = ()) -> "CommitStore":
+        """Build from dicts with hash/author/email/date/message/files_changed, streaming into compact arrays"""
+        author_vocab, email_vocab, path_vocab = _Interner(authors), _Interner(emails), _Interner(paths)
+        hashes, author_ids, email_ids, dates = [], array('i'), array('i'), array('q')
+        message_offsets, messages = array('q', [0]), bytearray()
+        file_offsets, file_ids = array('q', [0]), array('i')
+
+        for commit in commits:
+            hashes.append(commit['hash'].encode('ascii'))
+            author_ids.append(author_vocab.intern(str(commit['author'])))
+            email_ids.append(email_vocab.intern(str(commit['email'])))
+            dates.append(cls._to_epoch(commit['date']))
+            messages += str(commit['message']).encode('utf-8', 'surrogatepass')
+            message_offsets.append(len(messages))
+            file_ids.extend(path_vocab.intern(path) for path in (commit['files_changed'] or []))
+            file_offsets.append(len(file_ids))
+
+        return cls(np.array(hashes, dtype='S40'), np.frombuffer(author_ids, dtype=np.int32),
+                   np.frombuffer(email_ids, dtype=np.int32), np.frombuffer(dates, dtype=np.int64),
+                   np.frombuffer(message_offsets, dtype=np.int64), bytes(messages),
+                   np.frombuffer(file_offsets, dtype=np.int64), np.frombuffer(file_ids, dtype=np.int32),
+                   author_vocab.values, email_vocab.values, path_vocab.values)
+
+    @classmethod
+    def from_dataframe(cls, commit_df: pd.DataFrame) -> "CommitStore":
+        return cls.from_commits(commit_df.to_dict('records'))
+
+    @classmethod
+    def coerce(cls, commits) -> "CommitStore":
+        """Accept either a CommitStore or the legacy commit DataFrame"""
+        return commits if isinstance(commits, CommitStore) else cls.from_dataframe(commits)
+
+    @classmethod
+    def concat(cls, newer: "CommitStore", older: "CommitStore") -> "CommitStore":
+        """Prepend newly parsed commits to an existing store, remapping newer ids into the older vocabularies"""
+        def merge(older_values, newer_values):
+            vocab = _Interner(older_values)
+            return vocab.values, np.array([vocab.intern(v) for v in newer_values], dtype=np.int32)
+
+        authors, author_map = merge(older.authors, newer.authors)
+        emails, email_map = merge(older.emails, newer.emails)
+        paths, path_map = merge(older.paths, newer.paths)
+        return cls(
+            np.concatenate([newer.hashes, older.hashes]),
+            np.concatenate([author_map[newer.author_ids], older.author_ids]),
+            np.concatenate([email_map[newer.email_ids], older.email_ids]),
+            np.concatenate([newer.dates, older.dates]),
+            np.concatenate([newer.message_offsets, older.message_offsets[1:] + newer.message_offsets[-1]]),
+            newer.message_data + older.message_data,
+            np.concatenate([newer.file_offsets, older.file_offsets[1:] + newer.file_offsets[-1]]),
+            np.concatenate([path_map[newer.file_ids], older.file_ids]),
+            authors, emails, paths,
+        )
+
+    @staticmethod
+    def _to_epoch(date) -> int:
+        """Epoch seconds; naive datetimes are local time, like datetime.fromtimestamp"""
+        if isinstance(date, (int, np.integer)):
+            return int(date)
+        if isinstance(date, str):
+            date = datetime.fromisoformat(date)
+        elif not isinstance(date, datetime) or isinstance(date, pd.Timestamp):
+            date = pd.Timestamp(date).to_pydatetime()
+        return int(date.timestamp())
+
+    # ---- row access ---------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def hash(self, row: int) -> str:
+        return self.hashes[row].decode('ascii')
+
+    def message(self, row: int) -> str:
+        start, end = self.message_offsets[row], self.message_offsets[row + 1]
+        return self.message_data[start:end].decode('utf-8', 'surrogatepass')
+
+    def file_ids_of(self, row: int) -> np.ndarray:
+        return self.file_ids[self.file_offsets[row]:self.file_offsets[row + 1]]
+
+    def files_of(self, row: int) -> List[str]:
+        return [self.paths[i] for i in self.file_ids_of(row)]
+
+    def row(self, row: int) -> Dict:
+        """Hydrate one commit as the dict shape the rest of the app expects"""
+        return {
+            'hash': self.hash(row),
+            'author': self.authors[self.author_ids[row]],
+            'email': self.emails[self.email_ids[row]],
+            'date': datetime.fromtimestamp(int(self.dates[row])),
+            'message': self.message(row),
+            'files_changed': self.files_of(row),
+        }
+
+    def hash_list(self) -> List[str]:
+        return [h.decode('ascii') for h in self.hashes]
+
+    def message_list(self) -> List[str]:
+        return [self.message(i) for i in range(len(self))]
+
+    def sorted_hashes(self):
+        """(order, hashes[order]) built once; binary search over it replaces a hash -> row dict"""
+        if self._hash_order is None:
+            order = np.argsort(self.hashes)
+            self._hash_order = (order, self.hashes[order])
+        return self._hash_order
+
+    def row_for_hash(self, commit_hash: str) -> Optional[int]:
+        """Row of a full or unambiguous abbreviated (7+ chars) commit hash"""
+        if not 7 <= len(commit_hash) <= 40:
+            return None
+        order, hashes = self.sorted_hashes()
+        prefix = commit_hash.encode('ascii', 'ignore')
+        i = int(np.searchsorted(hashes, prefix))
+        if i == len(hashes) or not hashes[i].startswith(prefix):
+            return None
+        if len(prefix) < 40 and i + 1 < len(hashes) and hashes[i + 1].startswith(prefix):
+            return None  # ambiguous abbreviation
+        return int(order[i])
+
+    def to_dataframe(self, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        rows = range(len(self)) if rows is None else rows
+        records = [self.row(int(i)) for i in rows]
+        return pd.DataFrame(records, columns=['hash', 'author', 'email', 'date', 'message', 'files_changed'])
+
+    # ---- filters ------------------------------------------------------
+
+    def _path_ids_named(self, name: str) -> List[int]:
+        """Path ids whose basename is `name`"""
+        if self._path_ids_by_name is None:
+            # Keyed by basename only, so the index stays O(paths); candidates are checked against the full path
+            by_name = {}
+            for path_id, path in enumerate(self.paths):
+                by_name.setdefault(path.replace('\\', '/').rsplit('/', 1)[-1], []).append(path_id)
+            self._path_ids_by_name = by_name
+        return self._path_ids_by_name.get(name, [])
+
+    def path_id(self, path: str) -> Optional[int]:
+        """Id of an exact repo-relative path, or None if no commit touched it"""
+        path = path.replace('\\', '/')
+        for path_id in self._path_ids_named(path.rsplit('/', 1)[-1]):
+            if self.paths[path_id].replace('\\', '/') == path:
+                return path_id
+        return None
+
+    def path_ids_matching(self, file_mentions: Iterable[str]) -> np.ndarray:
+        """Path ids equal to a mention or ending with '/<mention>' ('parser.py' ~ 'src/parser.py')"""
+        ids = set()
+        for mention in file_mentions:
+            mention = mention.replace('\\', '/')
+            for path_id in self._path_ids_named(mention.rsplit('/', 1)[-1]):
+                path = self.paths[path_id].replace('\\', '/')
+                if path == mention or path.endswith('/' + mention):
+                    ids.add(path_id)
+        return np.array(sorted(ids), dtype=np.int32)
+
+    def _inverted_paths(self):
+        """CSR path -> rows index, built once"""
+        if self._rows_by_path is None:
+            row_of_value = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.file_offsets))
+            order = np.argsort(self.file_ids, kind='stable')
+            counts = np.bincount(self.file_ids, minlength=len(self.paths))
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            self._rows_by_path = (offsets, row_of_value[order])
+        return self._rows_by_path
+
+    def rows_touching(self, path_ids: np.ndarray) -> np.ndarray:
+        """Sorted rows of commits that changed any of the given paths"""
+        if len(path_ids) == 0:
+            return np.zeros(0, dtype=np.int64)
+        offsets, rows = self._inverted_paths()
+        return np.unique(np.concatenate([rows[offsets[p]:offsets[p + 1]] for p in path_ids]))
+
+    def touch_mask(self, path_ids: np.ndarray) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.rows_touching(path_ids)] = True
+        return mask
+
+    def date_mask(self, lower: Optional[datetime] = None, upper: Optional[datetime] = None, strict_lower: bool = False) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+        if lower is not None:
+            mask &= (self.dates > self._to_epoch(lower)) if strict_lower else (self.dates >= self._to_epoch(lower))
+        if upper is not None:
+            mask &= self.dates <= self._to_epoch(upper)
+        return mask
+
+    def author_mask(self, authors: Iterable[str]) -> np.ndarray:
+        wanted = [self.authors.index(a) for a in authors if a in self.authors]
+        return np.isin(self.author_ids, wanted)
+
+    def paths_of_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Distinct path ids changed by a set of commits"""
+        if len(rows) == 0:
+            return np.zeros(0, dtype=np.int32)
+        starts, ends = self.file_offsets[rows], self.file_offsets[np.asarray(rows) + 1]
+        return np.unique(np.concatenate([self.file_ids[s:e] for s, e in zip(starts, ends)]))
@@ -0,0 +1,88 @@
+# DataIngestion/compare_backends.py
+"""Compare embedding backends on throughput and retrieval agreement.
+
+Usage:
+    python -m DataIngestion.compare_backends --repo repo_directory \
+        --backends sentence-transformers onnx-int8 --threads 1 4
+
+The first backend is the reference. For every other backend we report
+recall@k of its nearest neighbours against the reference neighbours over the
+same sample of code chunks, which is what matters for search quality.
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+
+from DataIngestion.embedding_backends import get_backend
+
+
+def sample_texts(repo_path: str, limit: int = 512, chunk_words: int = 128) -> List[str]:
+    """Collect short chunks of text files from a repository"""
+    texts = []
+    for file_path in sorted(Path(repo_path).rglob('*.*')):
+        if not file_path.is_file() or any(part.startswith('.') for part in file_path.parts):
+            continue
+        try:
+            words = file_path.read_text().split()
+        except (UnicodeDecodeError, OSError):
+            continue
+        for i in range(0, len(words), chunk_words):
+            texts.append(' '.join(words[i:i + chunk_words]))
+            if len(texts) >= limit:
+                return texts
+    return texts
+
+
+def neighbour_recall(reference: np.ndarray, candidate: np.ndarray, k: int = 10) -> float:
+    """Average overlap of the top-k neighbour sets of each row (self excluded)"""
+    k = min(k, len(reference) - 1)
+    if k <= 0:
+        return 1.0
+
+    def top_k(vectors):
+        sims = vectors @ vectors.T
+        np.fill_diagonal(sims, -np.inf)
+        return np.argpartition(-sims, k, axis=1)[:, :k]
+
+    ref_nn, cand_nn = top_k(reference), top_k(candidate)
+    return float(np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_nn, cand_nn)]))
+
+
+def benchmark(backend, texts: List[str], batch_size: int = 32) -> Dict:
+    backend.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    start = time.perf_counter()
+    vectors = backend.encode(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return {'vectors': vectors, 'seconds': elapsed, 'texts_per_sec': len(texts) / elapsed if elapsed else float('inf')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends")
+    parser.add_argument("--repo", default=".", help="Repository to sample text from")
+    parser.add_argument("--backends", nargs="+", default=["sentence-transformers", "onnx-int8"])
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    parser.add_argument("--threads", nargs="+", type=int, default=[0], help="Thread counts to try (0 = library default)")
+    parser.add_argument("--limit", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    texts = sample_texts(args.repo, args.limit)
+    print(f"Sampled {len(texts)} chunks from {args.repo}")
+
+    reference = None
+    print(f"{'backend':<24}{'threads':>8}{'texts/s':>12}{'seconds':>10}{'recall@' + str(args.k):>12}")
+    for name in args.backends:
+        for threads in args.threads:
+            backend = get_backend(name, model_name=args.model, num_threads=threads or None)
+            result = benchmark(backend, texts, args.batch_size)
+            if reference is None:
+                reference = result['vectors']
+            recall = neighbour_recall(reference, result['vectors'], args.k)
+            print(f"{name:<24}{threads or '-':>8}{result['texts_per_sec']:>12.1f}{result['seconds']:>10.2f}{recall:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
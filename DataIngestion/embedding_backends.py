@@ -0,0 +1,182 @@
+# DataIngestion/embedding_backends.py
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import List, Optional, Union
+import numpy as np
+
+
+class EmbeddingBackend:
+    """Common interface for everything that turns text into vectors.
+
+    Backends return float32 matrices of shape (n, dimension) with L2-normalised
+    rows, so inner-product search behaves like cosine similarity regardless of
+    which backend produced the vectors.
+    """
+    name = "base"
+    dimension = 0
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        raise NotImplementedError
+
+    def _as_list(self, texts: Union[str, List[str]]) -> List[str]:
+        return [texts] if isinstance(texts, str) else list(texts)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Full-precision PyTorch encoder (the original behaviour)."""
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = "all-mpnet-base-v2", num_threads: Optional[int] = None, device: str = "cpu"):
+        from sentence_transformers import SentenceTransformer
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+        self.model = SentenceTransformer(model_name, device=device)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        texts = self._as_list(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        vectors = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+        return self._normalize(vectors)
+
+
+class OnnxInt8Backend(EmbeddingBackend):
+    """ONNX Runtime encoder with dynamically int8-quantized weights.
+
+    The transformer is exported once to ONNX, quantized with
+    `onnxruntime.quantization.quantize_dynamic` and cached under `cache_dir`;
+    later runs load the quantized file directly. Pooling and normalisation
+    mirror the sentence-transformers pipeline (mean pooling + L2 norm), and
+    inputs are truncated at the model's sentence-transformers `max_seq_length`
+    (384 for all-mpnet-base-v2) unless `max_length` is given.
+    """
+    name = "onnx-int8"
+
+    def __init__(self, model_name: str = "all-mpnet-base-v2", cache_dir: str = "onnx_models",
+                 num_threads: Optional[int] = None, max_length: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.model_dir = Path(cache_dir) / re.sub(r"[^\w.-]", "_", self.model_id)
+        quantized_path = self.model_dir / "model_int8.onnx"
+        if not quantized_path.exists():
+            self._export_and_quantize(quantized_path)
+        self.max_length = max_length or self._max_seq_length()
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(quantized_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def _max_seq_length(self, default: int = 384) -> int:
+        """Truncation length sentence-transformers uses for this model (sentence_bert_config.json)"""
+        config_path = self.model_dir / "sentence_bert_config.json"
+        if not config_path.exists():
+            try:
+                from huggingface_hub import hf_hub_download
+                config_path = Path(hf_hub_download(self.model_id, "sentence_bert_config.json", cache_dir=str(self.model_dir)))
+            except Exception as e:
+                print(f"No sentence-transformers config for {self.model_id}, truncating at {default} tokens: {str(e)}")
+                return default
+        with open(config_path) as f:
+            return json.load(f).get("max_seq_length", default)
+
+    def _export_and_quantize(self, quantized_path: Path):
+        """Export the HF model to ONNX and quantize its weights to int8 (one-off)."""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        from transformers import AutoTokenizer
+
+        print(f"Exporting {self.model_id} to ONNX in {self.model_dir}")
+        model = ORTModelForFeatureExtraction.from_pretrained(self.model_id, export=True)
+        model.save_pretrained(self.model_dir)
+        AutoTokenizer.from_pretrained(self.model_id).save_pretrained(self.model_dir)
+
+        print("Quantizing ONNX model weights to int8")
+        quantize_dynamic(str(self.model_dir / "model.onnx"), str(quantized_path), weight_type=QuantType.QInt8)
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        texts = self._as_list(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        batches = []
+        # Sort by length so each batch pads to a similar size, then restore the order
+        order = np.argsort([len(t) for t in texts])
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            tokens = self.tokenizer(batch, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+            feed = {k: v.astype(np.int64) for k, v in tokens.items() if k in self.input_names}
+            token_embeddings = self.session.run(None, feed)[0]
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled)
+
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        vectors[order] = np.concatenate(batches)
+        return self._normalize(vectors)
+
+
+class HashingBackend(EmbeddingBackend):
+    """Tiny deterministic encoder for tests and offline runs.
+
+    Hashes word tokens into a fixed number of signed buckets. No model
+    download, no randomness across processes, and texts sharing words get
+    similar vectors, which is enough to exercise the search pipeline.
+    """
+    name = "hashing"
+
+    def __init__(self, dimension: int = 768):
+        self.dimension = dimension
+
+    def _bucket(self, token: str):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimension, 1.0 if (value >> 63) & 1 else -1.0
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        texts = self._as_list(texts)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                bucket, sign = self._bucket(token)
+                vectors[row, bucket] += sign
+        return self._normalize(vectors)
+
+
+BACKENDS = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    OnnxInt8Backend.name: OnnxInt8Backend,
+    HashingBackend.name: HashingBackend,
+}
+
+
+def get_backend(name: Optional[str] = None, **kwargs) -> EmbeddingBackend:
+    """Create a backend by name. Defaults to $GITCHAT_EMBEDDING_BACKEND or sentence-transformers."""
+    name = name or os.environ.get("GITCHAT_EMBEDDING_BACKEND", SentenceTransformerBackend.name)
+    if kwargs.get("num_threads") is None and os.environ.get("GITCHAT_EMBEDDING_THREADS"):  # None = not set by the caller
+        kwargs["num_threads"] = int(os.environ["GITCHAT_EMBEDDING_THREADS"])
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name}. Available: {', '.join(BACKENDS)}")
+    if name == HashingBackend.name:
+        kwargs.pop("num_threads", None)
+        kwargs.pop("model_name", None)
+    return BACKENDS[name](**kwargs)
@@ -0,0 +1,126 @@
+# DataIngestion/embedding_store.py
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+_MAGIC = b"\x93NUMPY\x01\x00"
+_HEADER_LEN = 128  # fixed so the row count can be rewritten in place
+
+
+class EmbeddingStore:
+    """Append-only on-disk embedding matrix with id and metadata columns.
+
+    Layout of the store directory:
+        vectors.npy     - float32 (count, dimension) matrix, a regular .npy file
+        ids.jsonl       - one id per row
+        metadata.jsonl  - one JSON object per row
+
+    The .npy header has a fixed size and is rewritten last on every append, so
+    it acts as the commit point: readers only ever see fully written rows, and
+    memory maps opened before an append stay valid because the file only grows.
+    Readers get the matrix through `vectors()` as a read-only memory map, which
+    lets several worker processes share one copy in the OS page cache.
+    """
+
+    def __init__(self, path: str, dimension: Optional[int] = None):
+        self.path = Path(path)
+        self.vectors_path = self.path / "vectors.npy"
+        self.ids_path = self.path / "ids.jsonl"
+        self.metadata_path = self.path / "metadata.jsonl"
+        self.dimension = dimension
+        self._count = 0
+        self._mmap = None
+        self._ids = None
+        self._metadata = None
+
+        if self.vectors_path.exists():
+            self._count, self.dimension = self._read_shape()
+
+    @classmethod
+    def create(cls, path: str, dimension: int, overwrite: bool = True) -> "EmbeddingStore":
+        """Start an empty store at `path`"""
+        path = Path(path)
+        if path.exists() and overwrite:
+            shutil.rmtree(path)
+        path.mkdir(parents=True, exist_ok=True)
+        store = cls(path, dimension)
+        with open(store.vectors_path, "wb") as f:
+            f.write(store._header(0))
+        store.ids_path.touch()
+        store.metadata_path.touch()
+        return store
+
+    def _header(self, count: int) -> bytes:
+        header = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % (count, self.dimension)
+        header = header.ljust(_HEADER_LEN - len(_MAGIC) - 2 - 1) + "\n"
+        return _MAGIC + np.uint16(len(header)).tobytes() + header.encode("latin1")
+
+    def _read_shape(self):
+        with open(self.vectors_path, "rb") as f:
+            np.lib.format.read_magic(f)
+            shape, _, _ = np.lib.format.read_array_header_1_0(f)
+        return shape
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, vectors: np.ndarray, ids: List[str], metadata: Optional[List[Dict]] = None) -> None:
+        """Append rows; vectors are written straight to disk, not kept in memory"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        if len(vectors) != len(ids):
+            raise ValueError(f"Got {len(vectors)} vectors but {len(ids)} ids")
+        if metadata is not None and len(metadata) != len(ids):
+            raise ValueError(f"Got {len(ids)} ids but {len(metadata)} metadata rows")
+        if not len(ids):
+            return
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected dimension {self.dimension}, got {vectors.shape[1]}")
+
+        with open(self.vectors_path, "r+b") as f:
+            f.seek(_HEADER_LEN + self._count * self.dimension * 4)
+            f.write(vectors.tobytes())
+        with open(self.ids_path, "a") as f:
+            f.writelines(json.dumps(str(i)) + "\n" for i in ids)
+        with open(self.metadata_path, "a") as f:
+            f.writelines(json.dumps(m or {}, default=str) + "\n" for m in (metadata or [None] * len(ids)))
+
+        self._count += len(ids)
+        with open(self.vectors_path, "r+b") as f:
+            f.write(self._header(self._count))
+
+        # Cached views are for the old row count
+        self._mmap = None
+        self._ids = None
+        self._metadata = None
+
+    def vectors(self) -> np.ndarray:
+        """Read-only memory-mapped (count, dimension) float32 matrix, no copy"""
+        if self._mmap is None:
+            if self._count == 0:
+                return np.zeros((0, self.dimension or 0), dtype=np.float32)
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                   offset=_HEADER_LEN, shape=(self._count, self.dimension))
+        return self._mmap
+
+    def _read_column(self, path: Path) -> List:
+        rows = []
+        with open(path) as f:
+            for line in f:
+                if len(rows) == self._count:
+                    break  # rows past the header count belong to an interrupted append
+                rows.append(json.loads(line))
+        return rows
+
+    def ids(self) -> List[str]:
+        if self._ids is None:
+            self._ids = self._read_column(self.ids_path)
+        return self._ids
+
+    def metadata(self) -> List[Dict]:
+        if self._metadata is None:
+            self._metadata = self._read_column(self.metadata_path)
+        return self._metadata
@@ -4,6 +4,7 @@ import github
 import pandas as pd
 from datetime import datetime
 from typing import List, Dict
+from DataIngestion.commit_store import CommitStore
 
 
 class GitHistoryParser:
@@ -20,12 +21,9 @@ class GitHistoryParser:
 
 
 
-    def parse_commit_history(self) -> pd.DataFrame:
-        """Parse git commit history into structured DataFrame"""
-        commits_data = []
-
-        for commit in self.repo.iter_commits():
-            commit_data = {
+    def _iter_commit_dicts(self, rev: str = None):
+        for commit in self.repo.iter_commits(rev):
+            yield {
                 "hash": commit.hexsha,
                 "author": commit.author.name,
                 "email": commit.author.email,
@@ -33,6 +31,11 @@ class GitHistoryParser:
                 "message": commit.message.strip(),
                 "files_changed": [item for item in commit.stats.files.keys()]
             }
-            commits_data.append(commit_data)
 
-        return pd.DataFrame(commits_data)
\ No newline at end of file
+    def parse_commit_history(self, rev: str = None) -> pd.DataFrame:
+        """Parse git commit history into structured DataFrame (optionally only a revision range like 'old..HEAD')"""
+        return pd.DataFrame(list(self._iter_commit_dicts(rev)))
+
+    def parse_commit_store(self, rev: str = None) -> CommitStore:
+        """Parse git commit history straight into the compact interned CommitStore"""
+        return CommitStore.from_commits(self._iter_commit_dicts(rev))
\ No newline at end of file
@@ -0,0 +1,219 @@
+# DataIngestion/history_aggregates.py
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from DataIngestion.commit_store import CommitStore
+
+
+_MONTH_STRIDE = 12 * 10000  # larger than any month bucket, so key_id * stride + month sorts by key, then month
+
+
+def month_bucket(date: datetime) -> int:
+    """Churn bucket of a date: months since year 0"""
+    return date.year * 12 + date.month - 1
+
+
+def _ancestor_dirs(path: str) -> List[str]:
+    """'Search/lexical_search.py' -> ['Search/']; nested paths give every parent directory"""
+    parts = path.replace('\\', '/').split('/')[:-1]
+    return ['/'.join(parts[:i]) + '/' for i in range(1, len(parts) + 1)]
+
+
+def _count_pairs(a: np.ndarray, b: np.ndarray, b_size: int):
+    """Distinct (a, b) pairs with their number of occurrences"""
+    if len(a) == 0:
+        return [], [], []
+    pairs, counts = np.unique(a.astype(np.int64) * max(b_size, 1) + b, return_counts=True)
+    return (pairs // max(b_size, 1)).tolist(), (pairs % max(b_size, 1)).tolist(), counts.tolist()
+
+
+class HistoryAggregates:
+    """Ownership and churn rollups over the commit history, precomputed at ingestion.
+
+    Keys are repo paths for files and 'dir/' (trailing slash) for directories:
+        authors      - key -> Counter(author -> commits touching it)
+        last_touched - key -> epoch seconds of the newest commit touching it
+        keys         - key id -> key
+        churn_codes  - sorted int64 key_id * _MONTH_STRIDE + month, one entry per
+                       (key, month) that has commits, so storage is sparse
+        churn_cumulative - int32 running total of commits per key up to that month
+
+    The churn of a key over a period is the difference of two running totals,
+    found by binary search, so a period query costs O(keys log entries).
+
+    A directory counts each commit once, however many of its files changed.
+    `extend` folds in only the newly parsed commits and shares every untouched
+    counter with the previous generation, so counters are never mutated after
+    construction.
+    """
+
+    def __init__(self, authors: Dict[str, Counter], last_touched: Dict[str, int], keys: List[str],
+                 churn_codes: np.ndarray, churn_cumulative: np.ndarray):
+        self.authors = authors
+        self.last_touched = last_touched
+        self.keys = keys
+        self.churn_codes = churn_codes
+        self.churn_cumulative = churn_cumulative
+        is_directory = np.array([key.endswith('/') for key in keys], dtype=bool)
+        self._columns = {False: np.flatnonzero(~is_directory), True: np.flatnonzero(is_directory)}
+        self._keys_by_name = None
+
+    # ---- construction -------------------------------------------------
+
+    @classmethod
+    def build(cls, store: CommitStore) -> "HistoryAggregates":
+        authors, churn, last_touched = cls._accumulate(store, len(store))
+        return cls(authors, last_touched, *cls._cumulative(churn))
+
+    @classmethod
+    def extend(cls, previous: "HistoryAggregates", store: CommitStore, num_new: int) -> "HistoryAggregates":
+        """Aggregates for `store` whose first `num_new` rows are the commits added since `previous`"""
+        authors, churn, last_touched = cls._accumulate(store, num_new)
+        merged_authors = dict(previous.authors)
+        for key, counts in authors.items():
+            merged_authors[key] = merged_authors[key] + counts if key in merged_authors else counts
+        merged_last = dict(previous.last_touched)
+        for key, epoch in last_touched.items():
+            merged_last[key] = max(epoch, merged_last.get(key, epoch))
+        return cls(merged_authors, merged_last, *cls._cumulative(churn, previous))
+
+    @staticmethod
+    def _cumulative(churn: Dict[int, Counter], previous: Optional["HistoryAggregates"] = None):
+        """(keys, churn_codes, churn_cumulative) for per-month deltas merged with the previous entries"""
+        keys = list(previous.keys) if previous is not None else []
+        key_ids = {key: i for i, key in enumerate(keys)}
+        codes, counts = [], []
+        for month, month_counts in churn.items():
+            for key, count in month_counts.items():
+                if key not in key_ids:
+                    key_ids[key] = len(keys)
+                    keys.append(key)
+                codes.append(key_ids[key] * _MONTH_STRIDE + month)
+                counts.append(count)
+        codes, counts = np.array(codes, dtype=np.int64), np.array(counts, dtype=np.int64)
+
+        if previous is not None and len(previous.churn_codes):
+            # Back from running totals to per-month counts, then merge with the new months
+            previous_counts = np.diff(previous.churn_cumulative, prepend=0).astype(np.int64)
+            key_starts = np.r_[True, np.diff(previous.churn_codes // _MONTH_STRIDE) != 0]
+            previous_counts[key_starts] = previous.churn_cumulative[key_starts]
+            codes = np.concatenate([previous.churn_codes, codes])
+            counts = np.concatenate([previous_counts, counts])
+
+        codes, inverse = np.unique(codes, return_inverse=True)
+        counts = np.bincount(inverse, weights=counts, minlength=len(codes)).astype(np.int64)
+        # Running totals restart at every key
+        totals = np.cumsum(counts)
+        key_starts = np.r_[True, np.diff(codes // _MONTH_STRIDE) != 0] if len(codes) else np.zeros(0, dtype=bool)
+        before = (totals - counts)[key_starts]
+        totals -= before[np.cumsum(key_starts) - 1] if len(codes) else 0
+        return keys, codes, totals.astype(np.int32)
+
+    @staticmethod
+    def _accumulate(store: CommitStore, num_rows: int) -> Tuple[Dict[str, Counter], Dict[int, Counter], Dict[str, int]]:
+        """Rollups for rows [0, num_rows), vectorised over the CSR file columns"""
+        authors, churn, last_touched = {}, {}, {}
+        if num_rows == 0:
+            return authors, churn, last_touched
+
+        # One value per (commit, file) pair
+        rows = np.repeat(np.arange(num_rows), np.diff(store.file_offsets[:num_rows + 1]))
+        path_ids = store.file_ids[:store.file_offsets[num_rows]]
+        row_months = np.array([month_bucket(datetime.fromtimestamp(d)) for d in store.dates[:num_rows].tolist()],
+                              dtype=np.int64)
+
+        # Expand every file to its parent directories, keeping one value per (commit, directory)
+        used_paths, inverse = np.unique(path_ids, return_inverse=True)
+        dir_ids, dir_lists = {}, []
+        for path_id in used_paths.tolist():
+            dir_lists.append([dir_ids.setdefault(d, len(dir_ids)) for d in _ancestor_dirs(store.paths[path_id])])
+        dir_counts = np.array([len(d) for d in dir_lists], dtype=np.int64)[inverse]
+        flat_dirs = np.array([d for dirs in dir_lists for d in dirs], dtype=np.int64)
+        starts = np.concatenate([[0], np.cumsum([len(d) for d in dir_lists])])[inverse]
+        within = np.arange(dir_counts.sum()) - np.repeat(np.cumsum(dir_counts) - dir_counts, dir_counts)
+        dir_rows = np.repeat(rows, dir_counts)
+        dir_of_value = flat_dirs[np.repeat(starts, dir_counts) + within] if len(flat_dirs) else flat_dirs
+        dir_pairs = np.unique(dir_of_value * num_rows + dir_rows) if len(dir_rows) else dir_rows
+        dir_names = list(dir_ids)
+
+        levels = [
+            (path_ids.astype(np.int64), rows, lambda i: store.paths[i]),
+            (dir_pairs // num_rows, dir_pairs % num_rows, lambda i: dir_names[i]),
+        ]
+        n_authors = len(store.authors)
+        for keys, key_rows, name in levels:
+            for key, author, count in zip(*_count_pairs(keys, store.author_ids[key_rows], n_authors)):
+                authors.setdefault(name(key), Counter())[store.authors[author]] = count
+            months = row_months[key_rows]
+            base = int(months.min()) if len(months) else 0
+            for key, month, count in zip(*_count_pairs(keys, months - base, int(np.ptp(months)) + 1 if len(months) else 1)):
+                churn.setdefault(month + base, Counter())[name(key)] = count
+            if len(keys):
+                newest = np.full(int(keys.max()) + 1, np.iinfo(np.int64).min)
+                np.maximum.at(newest, keys, store.dates[key_rows])
+                for key in np.unique(keys).tolist():
+                    last_touched[name(key)] = int(newest[key])
+        return authors, churn, last_touched
+
+    # ---- lookups ------------------------------------------------------
+
+    def resolve(self, mention: str) -> Optional[str]:
+        """Aggregate key for a file or directory mention ('parser.py', 'Search', 'src/search/')"""
+        mention = mention.replace('\\', '/').strip()
+        if mention.startswith('./'):
+            mention = mention[2:]
+        if mention in self.authors:
+            return mention
+        if mention.rstrip('/') + '/' in self.authors:
+            return mention.rstrip('/') + '/'
+        if self._keys_by_name is None:
+            # basename -> keys, O(keys); candidates are checked against the full mention
+            by_name = {}
+            for key in self.authors:
+                by_name.setdefault(key.rstrip('/').rsplit('/', 1)[-1], []).append(key)
+            self._keys_by_name = by_name
+        path = mention.rstrip('/')
+        candidates = self._keys_by_name.get(path.rsplit('/', 1)[-1], [])
+        files = [] if mention.endswith('/') else [k for k in candidates if k.endswith('/' + path)]
+        directories = [k for k in candidates if k.endswith('/' + path + '/')]
+        return (files or directories or [None])[0]
+
+    def owners(self, mention: str, top_n: int = 5) -> Optional[Dict]:
+        """Top authors of a file or directory by number of commits touching it"""
+        key = self.resolve(mention)
+        if key is None:
+            return None
+        counts = self.authors[key]
+        return {
+            'path': key,
+            'is_directory': key.endswith('/'),
+            'authors': counts.most_common(top_n),
+            'commits': sum(counts.values()),
+            'last_touched': datetime.fromtimestamp(self.last_touched[key]),
+        }
+
+    def _running_total(self, key_ids: np.ndarray, month: int) -> np.ndarray:
+        """Commits touching each key in all months up to and including `month` (binary search per key)"""
+        base = key_ids.astype(np.int64) * _MONTH_STRIDE
+        starts = np.searchsorted(self.churn_codes, base, side='left')
+        ends = np.searchsorted(self.churn_codes, base + month, side='right')
+        return np.where(ends > starts, self.churn_cumulative[np.maximum(ends - 1, 0)], 0) if len(self.churn_codes) \
+            else np.zeros(len(key_ids), dtype=np.int32)
+
+    def top_churn(self, lower: Optional[datetime] = None, upper: Optional[datetime] = None,
+                  directories: bool = False, top_n: int = 10) -> List[Tuple[str, int]]:
+        """Most frequently changed files (or directories) in the months spanning [lower, upper]"""
+        columns = self._columns[directories]
+        if top_n <= 0 or not len(columns):
+            return []
+        first = month_bucket(lower) if lower is not None else 0
+        last = month_bucket(upper) if upper is not None else _MONTH_STRIDE - 1
+        if last < first:
+            return []
+        counts = self._running_total(columns, last) - self._running_total(columns, first - 1)
+        k = min(top_n, len(counts))
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.argsort(-counts[top], kind='stable')]
+        return [(self.keys[columns[i]], int(counts[i])) for i in top if counts[i] > 0]
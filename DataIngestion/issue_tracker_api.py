@@ -6,10 +6,10 @@ from DataIngestion.code_message_vectorizer import CodeMessageVectorizer # Import
 
 
 class IssueTrackerAPI:
-    def __init__(self, github_token: Optional[str] = None, repo_name: str="visha1Sagar/GitChat"):
+    def __init__(self, github_token: Optional[str] = None, repo_name: str="visha1Sagar/GitChat", vectorizer: Optional[CodeMessageVectorizer] = None):
         self.github = Github(github_token)
         self.repo = self.github.get_repo(repo_name)
-        self.vectorizer = CodeMessageVectorizer() # Initialize vectorizer here
+        self.vectorizer = vectorizer or CodeMessageVectorizer() # Reuse the caller's vectorizer so the model is loaded once
 
     def fetch_repo_issues(self, repo_name: str) -> List[Dict]:
         """Fetch issues and discussions from a GitHub repository and vectorize them."""
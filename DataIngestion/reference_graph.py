@@ -0,0 +1,178 @@
+# DataIngestion/reference_graph.py
+import re
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+from DataIngestion.commit_store import CommitStore
+
+_ISSUE_MENTION = re.compile(r"(?:\b(fix(?:es|ed)?|close[sd]?|resolve[sd]?)\s+)?#(\d+)\b", flags=re.IGNORECASE)
+_HASH_MENTION = re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{7,40}\b")
+_FILE_MENTION = re.compile(r"\b([\w/.-]*\w+\.\w{2,4})\b")
+
+
+class Adjacency:
+    """CSR adjacency list: neighbours of node i are targets[offsets[i]:offsets[i + 1]] (sorted, distinct)"""
+
+    def __init__(self, offsets: np.ndarray, targets: np.ndarray):
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def from_pairs(cls, sources: np.ndarray, targets: np.ndarray, num_nodes: int) -> "Adjacency":
+        sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+        if len(sources):
+            width = int(targets.max()) + 1
+            pairs = np.unique(sources * width + targets)
+            sources, targets = pairs // width, pairs % width
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=num_nodes))]).astype(np.int64)
+        return cls(offsets, targets.astype(np.int32))
+
+    def __getitem__(self, node: int) -> np.ndarray:
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def edges(self):
+        """(sources, targets) of every edge"""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets)), self.targets
+
+
+class ReferenceGraph:
+    """Commit <-> issue <-> file links extracted once at ingestion.
+
+    Node ids are commit rows of the CommitStore, issue rows (positions in the
+    fetched issue list, which is also the issue vector row) and path ids of the
+    store's path vocabulary. Edges:
+        commit_issues / issue_commits - '#123' / 'fixes #123' in commit messages,
+                                        and commit hashes quoted in issues
+        issue_issues                  - '#123' in an issue's title, body or comments
+        issue_files / file_issues     - files named in an issue, plus files changed
+                                        by its linked commits
+    commit <-> file edges are the store's own files_changed CSR columns.
+
+    The raw '#N' mentions per commit are kept (`mention_offsets`, `mention_numbers`,
+    `mention_fixes`), so the next generation only scans the new commit messages.
+    """
+
+    def __init__(self, store: CommitStore, issue_numbers: np.ndarray, mention_offsets: np.ndarray,
+                 mention_numbers: np.ndarray, mention_fixes: np.ndarray, commit_issues: Adjacency,
+                 issue_commits: Adjacency, issue_issues: Adjacency, issue_files: Adjacency, file_issues: Adjacency):
+        self.store = store
+        self.issue_numbers = issue_numbers
+        self.mention_offsets = mention_offsets
+        self.mention_numbers = mention_numbers
+        self.mention_fixes = mention_fixes
+        self.commit_issues = commit_issues
+        self.issue_commits = issue_commits
+        self.issue_issues = issue_issues
+        self.issue_files = issue_files
+        self.file_issues = file_issues
+        self._issue_rows = {number: row for row, number in enumerate(issue_numbers.tolist())}
+
+    # ---- construction -------------------------------------------------
+
+    @staticmethod
+    def _scan_messages(store: CommitStore, num_rows: int):
+        """'#N' mentions of commit rows [0, num_rows) as a CSR of issue numbers plus a 'fixes' flag"""
+        offsets, numbers, fixes = [0], [], []
+        for row in range(num_rows):
+            for match in _ISSUE_MENTION.finditer(store.message(row)):
+                numbers.append(int(match.group(2)))
+                fixes.append(match.group(1) is not None)
+            offsets.append(len(numbers))
+        return np.array(offsets, dtype=np.int64), np.array(numbers, dtype=np.int64), np.array(fixes, dtype=bool)
+
+    @staticmethod
+    def _issue_text(issue: Dict) -> str:
+        comments = ' '.join(c.get('body') or '' for c in issue.get('comments') or [])
+        return f"{issue.get('title') or ''} {issue.get('body') or ''} {comments}"
+
+    @classmethod
+    def build(cls, store: CommitStore, issues: List[Dict], previous: Optional["ReferenceGraph"] = None,
+              num_new: Optional[int] = None) -> "ReferenceGraph":
+        """Extract every link; with `previous` and `num_new`, only the first num_new commit messages are scanned"""
+        if previous is not None and num_new is not None:
+            offsets, numbers, fixes = cls._scan_messages(store, num_new)
+            offsets = np.concatenate([offsets, previous.mention_offsets[1:] + offsets[-1]])
+            numbers = np.concatenate([numbers, previous.mention_numbers])
+            fixes = np.concatenate([fixes, previous.mention_fixes])
+        else:
+            offsets, numbers, fixes = cls._scan_messages(store, len(store))
+
+        issue_numbers = np.array([issue['number'] for issue in issues], dtype=np.int64)
+        issue_rows = {number: row for row, number in enumerate(issue_numbers.tolist())}
+
+        # Commit -> issue edges for mentions of issues we actually fetched
+        mention_commits = np.repeat(np.arange(len(store), dtype=np.int64), np.diff(offsets))
+        mention_issues = np.array([issue_rows.get(n, -1) for n in numbers.tolist()], dtype=np.int64)
+        known = mention_issues >= 0
+        commit_sources, issue_targets = [mention_commits[known]], [mention_issues[known]]
+
+        # Issue side: other issues, commit hashes and file paths named in the text
+        issue_issue_pairs, issue_file_pairs = [], []
+        for row, issue in enumerate(issues):
+            text = cls._issue_text(issue)
+            for match in _ISSUE_MENTION.finditer(text):
+                other = issue_rows.get(int(match.group(2)))
+                if other is not None and other != row:
+                    issue_issue_pairs.append((row, other))
+            for commit_hash in set(_HASH_MENTION.findall(text)):
+                commit_row = store.row_for_hash(commit_hash)  # ambiguous abbreviations give None
+                if commit_row is not None:
+                    commit_sources.append([commit_row])
+                    issue_targets.append([row])
+            files = _FILE_MENTION.findall(text)
+            if files:
+                issue_file_pairs.extend((row, path_id) for path_id in store.path_ids_matching(files).tolist())
+
+        commit_issues = Adjacency.from_pairs(np.concatenate(commit_sources), np.concatenate(issue_targets), len(store))
+        issue_commit_sources, issue_commit_targets = commit_issues.edges()
+        issue_commits = Adjacency.from_pairs(issue_commit_targets, issue_commit_sources, len(issues))
+
+        # Files changed by an issue's linked commits are affected files of the issue
+        linked_issues, linked_commits = issue_commits.edges()
+        file_counts = np.diff(store.file_offsets)[linked_commits]
+        file_starts = np.repeat(store.file_offsets[linked_commits], file_counts)
+        within = np.arange(file_counts.sum()) - np.repeat(np.cumsum(file_counts) - file_counts, file_counts)
+        changed_files = store.file_ids[file_starts + within]
+        named = np.array(issue_file_pairs, dtype=np.int64).reshape(-1, 2)
+        file_sources = np.concatenate([np.repeat(linked_issues, file_counts), named[:, 0]])
+        file_targets = np.concatenate([changed_files.astype(np.int64), named[:, 1]])
+        issue_files = Adjacency.from_pairs(file_sources, file_targets, len(issues))
+        file_issues = Adjacency.from_pairs(file_targets, file_sources, len(store.paths))
+
+        pairs = np.array(issue_issue_pairs, dtype=np.int64).reshape(-1, 2)
+        issue_issues = Adjacency.from_pairs(pairs[:, 0], pairs[:, 1], len(issues))
+
+        return cls(store, issue_numbers, offsets, numbers, fixes, commit_issues, issue_commits, issue_issues,
+                   issue_files, file_issues)
+
+    # ---- lookups ------------------------------------------------------
+
+    def issue_row(self, number: int) -> Optional[int]:
+        return self._issue_rows.get(number)
+
+    def issues_of_commit(self, row: int) -> List[int]:
+        """Issue numbers linked to a commit, issues it fixes/closes first"""
+        rows = self.commit_issues[row]
+        start, end = self.mention_offsets[row], self.mention_offsets[row + 1]
+        fixed = set(self.mention_numbers[start:end][self.mention_fixes[start:end]].tolist())
+        numbers = self.issue_numbers[rows].tolist()
+        return sorted(numbers, key=lambda n: n not in fixed)
+
+    def commits_of_issue(self, number: int) -> List[str]:
+        row = self.issue_row(number)
+        return [] if row is None else [self.store.hash(c) for c in self.issue_commits[row].tolist()]
+
+    def files_of_issue(self, number: int) -> List[str]:
+        row = self.issue_row(number)
+        return [] if row is None else [self.store.paths[p] for p in self.issue_files[row].tolist()]
+
+    def issues_of_files(self, path_ids: Iterable[int]) -> List[int]:
+        rows = [self.file_issues[p] for p in path_ids]
+        return self.issue_numbers[np.unique(np.concatenate(rows))].tolist() if rows else []
+
+    def linked_issues_of_issue(self, number: int) -> List[int]:
+        row = self.issue_row(number)
+        return [] if row is None else self.issue_numbers[self.issue_issues[row]].tolist()
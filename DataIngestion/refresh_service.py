@@ -0,0 +1,162 @@
+# DataIngestion/refresh_service.py
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import git
+
+from DataIngestion.commit_store import CommitStore
+
+
+class IndexGeneration:
+    """One immutable, fully built set of indexes and the commit table they were built from."""
+
+    def __init__(self, generation_id: int, path: str, commit_store: CommitStore, issues: List[Dict],
+                 search_engine, memory, response_gen, ref_state: Dict[str, str], aggregates=None,
+                 reference_graph=None):
+        self.generation_id = generation_id
+        self.path = path  # directory holding this generation's embedding stores
+        self.commit_store = commit_store
+        self.issues = issues
+        self.search_engine = search_engine
+        self.memory = memory
+        self.response_gen = response_gen
+        self.ref_state = ref_state  # ref name -> commit sha at build time
+        self.aggregates = aggregates  # HistoryAggregates, extended by the next generation
+        self.reference_graph = reference_graph  # ReferenceGraph, reused by the next generation
+        self.readers = 0
+        self.retired = False
+
+    def close(self):
+        """Drop the indexes and delete the on-disk stores once nobody reads them"""
+        print(f"Reclaiming index generation {self.generation_id}")
+        self.search_engine = None
+        self.memory = None
+        self.response_gen = None
+        self.commit_store = None
+        self.aggregates = None
+        self.reference_graph = None
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class GenerationHandle:
+    """Double-buffered pointer to the current generation.
+
+    Queries pin the generation they started on with `use()`. `publish()` swaps
+    the pointer in one step, so new queries see the new generation while
+    in-flight ones finish on the old one; the old one is closed when its last
+    reader leaves.
+    """
+
+    def __init__(self):
+        self._current: Optional[IndexGeneration] = None
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> Optional[IndexGeneration]:
+        return self._current
+
+    @contextmanager
+    def use(self):
+        with self._lock:
+            generation = self._current
+            if generation is not None:
+                generation.readers += 1
+        try:
+            yield generation
+        finally:
+            if generation is not None:
+                self._release(generation)
+
+    def _release(self, generation: IndexGeneration):
+        with self._lock:
+            generation.readers -= 1
+            reclaim = generation.retired and generation.readers == 0
+        if reclaim:
+            generation.close()
+
+    def publish(self, generation: IndexGeneration) -> None:
+        with self._lock:
+            old, self._current = self._current, generation
+            reclaim = False
+            if old is not None and old is not generation:
+                old.retired = True
+                reclaim = old.readers == 0
+        print(f"Published index generation {generation.generation_id}")
+        if reclaim:
+            old.close()
+
+
+class RefreshService:
+    """Background thread that rebuilds the indexes when the repository's refs move.
+
+    Every `interval` seconds it snapshots the local refs and, if they changed
+    (or an issue refresh is due), calls
+    `build_fn(previous_generation, refresh_issues)` off the request path and
+    publishes the result through the handle. With `pull_remote` it first runs a
+    fast-forward pull, which is only meant for a clone the app made itself.
+    """
+
+    def __init__(self, repo: git.Repo, handle: GenerationHandle,
+                 build_fn: Callable[[IndexGeneration, bool], IndexGeneration],
+                 interval: float = 60.0, pull_remote: bool = False, issue_interval: Optional[float] = None):
+        self.repo = repo
+        self.handle = handle
+        self.build_fn = build_fn
+        self.interval = interval
+        self.pull_remote = pull_remote
+        self.issue_interval = issue_interval
+        self._since_issues = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def snapshot_refs(repo: git.Repo) -> Dict[str, str]:
+        """Current commit sha of every local branch, tag and remote-tracking ref"""
+        state = {}
+        for ref in repo.refs:
+            try:
+                state[ref.path] = ref.commit.hexsha
+            except (ValueError, git.BadName):
+                continue  # e.g. symbolic refs pointing at nothing yet
+        return state
+
+    def check_once(self) -> bool:
+        """Rebuild and publish if anything changed; returns True when a new generation went live"""
+        if self.pull_remote and self.repo.remotes:
+            try:
+                self.repo.remotes[0].pull(ff_only=True)
+            except git.GitCommandError as e:
+                print(f"Refresh pull failed, using local refs: {str(e)}")
+
+        self._since_issues += self.interval
+        refresh_issues = self.issue_interval is not None and self._since_issues >= self.issue_interval
+        current = self.handle.current
+        if current is not None and not refresh_issues and self.snapshot_refs(self.repo) == current.ref_state:
+            return False
+
+        new_generation = self.build_fn(current, refresh_issues)
+        if refresh_issues:
+            self._since_issues = 0.0
+        self.handle.publish(new_generation)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check_once()
+            except Exception as e:
+                print(f"Index refresh failed: {str(e)}")
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="index-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
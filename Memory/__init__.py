@@ -1,13 +1,16 @@
+from typing import Union
 import pandas as pd
 
+from DataIngestion.commit_store import CommitStore
+
 from Memory.conversation_history import ConversationHistory
 from Memory.temporal_linker import TemporalLinker
 
 
 class MemoryModule:
-    def __init__(self, commit_df: pd.DataFrame, storage_path: str = "sessions"):
-        self.history = ConversationHistory(storage_path)
-        self.linker = TemporalLinker(commit_df)
+    def __init__(self, commits: Union[CommitStore, pd.DataFrame], storage_path: str = "sessions", history: ConversationHistory = None):
+        self.history = history or ConversationHistory(storage_path)  # Shared across index generations
+        self.linker = TemporalLinker(commits)
 
     def add_conversation(self, query: str, answer: str) -> None:
         self.history.add_entry(query, answer)
@@ -1,59 +1,44 @@
 # temporal_linker.py
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Union
+import numpy as np
 import pandas as pd
 
+from DataIngestion.commit_store import CommitStore
+
 
 class TemporalLinker:
-    def __init__(self, commit_df: pd.DataFrame):
-        self.commit_df = commit_df
-        self.commit_df['date'] = pd.to_datetime(self.commit_df['date'])
+    def __init__(self, commits: Union[CommitStore, pd.DataFrame]):
+        self.store = CommitStore.coerce(commits)
 
-    def _find_code_changes(self, file_paths: List[str], after_date: datetime) -> pd.DataFrame:
+    def _find_code_changes(self, file_paths: List[str], after_date: datetime) -> np.ndarray:
         """Find commits affecting mentioned files after a given date"""
         if not file_paths:
-            return pd.DataFrame()
+            return np.zeros(0, dtype=np.int64)
 
-        return self.commit_df[
-            (self.commit_df['date'] > after_date) &
-            (self.commit_df['files_changed'].apply(
-                lambda files: any(f in file_paths for f in files)
-            ))
-            ]
+        rows = self.store.rows_touching(self.store.path_ids_matching(file_paths))
+        return rows[self.store.date_mask(after_date, strict_lower=True)[rows]]
 
-    def _find_related_commits(self, commit_hashes: List[str]) -> pd.DataFrame:
+    def _find_related_commits(self, commit_hashes: List[str]) -> np.ndarray:
         """Find subsequent commits to the same files"""
-        if not commit_hashes:
-            return pd.DataFrame()
-
-        # Get files from original commits
-        original_files = set()
-        for commit_hash in commit_hashes:
-            files = self.commit_df[self.commit_df['hash'] == commit_hash]['files_changed']
-            if not files.empty:
-                original_files.update(files.iloc[0])
+        commit_rows = [row for row in (self.store.row_for_hash(h) for h in commit_hashes) if row is not None]
+        if not commit_rows:
+            return np.zeros(0, dtype=np.int64)
 
-        # Find later commits touching these files
-        latest_commit_date = self.commit_df[self.commit_df['hash'].isin(commit_hashes)]['date'].max()
-        return self.commit_df[
-            (self.commit_df['date'] > latest_commit_date) &
-            (self.commit_df['files_changed'].apply(
-                lambda files: any(f in original_files for f in files)
-            ))
-            ]
+        # Files from original commits, then later commits touching them
+        original_files = self.store.paths_of_rows(np.array(commit_rows))
+        latest_commit_date = int(self.store.dates[commit_rows].max())
+        rows = self.store.rows_touching(original_files)
+        return rows[self.store.dates[rows] > latest_commit_date]
 
     def find_temporal_links(self, conversation_entry: Dict) -> Dict:
-        """Identify relevant code changes since a conversation"""
+        """Identify relevant code changes since a conversation (as commit rows)"""
         entry_date = datetime.fromisoformat(conversation_entry['timestamp'])
         entities = conversation_entry['entities']
 
         return {
-            'file_changes': self._find_code_changes(
-                entities['files'], entry_date
-            ).to_dict('records'),
-            'commit_followups': self._find_related_commits(
-                entities['commits']
-            ).to_dict('records'),
+            'file_changes': self._find_code_changes(entities['files'], entry_date),
+            'commit_followups': self._find_related_commits(entities['commits']),
             'issue_updates': [],  # Could integrate issue tracker here
             'entry_date': entry_date.isoformat(),
             'current_date': datetime.now().isoformat()
@@ -66,14 +51,14 @@ class TemporalLinker:
         for entry in history[-3:]:  # Last 3 conversations
             links = self.find_temporal_links(entry)
 
-            if links['file_changes']:
-                files = {f for c in links['file_changes'] for f in c['files_changed']}
+            if len(links['file_changes']):
+                files = {self.store.paths[p] for p in self.store.paths_of_rows(links['file_changes'])}
                 context.append(
                     f"Since your question on {entry['timestamp'][:10]} about {', '.join(files)}: "
                     f"{len(links['file_changes'])} subsequent commits were made"
                 )
 
-            if links['commit_followups']:
+            if len(links['commit_followups']):
                 original_commits = entry['entities']['commits'][:2]
                 context.append(
                     f"After your discussion of commits {', '.join(original_commits)}: "
@@ -5,12 +5,13 @@ from datetime import datetime
 
 
 class ResponseGenerator:
-    def __init__(self, issue_data: List[Dict]):
+    def __init__(self, issue_data: List[Dict], reference_graph=None):
         self.issue_map = {issue['number']: issue for issue in issue_data}
+        self.reference_graph = reference_graph  # ReferenceGraph for linked commits / affected files
 
     def _format_commit(self, commit: Dict) -> str:
         """Format commit information into natural language"""
-        date = commit['date'].to_pydatetime().strftime("%b %Y")
+        date = commit['date'].strftime("%b %Y")  # datetime or pandas Timestamp
         files = ", ".join(commit['files_changed'][:3])
         message = textwrap.shorten(commit['message'], width=120, placeholder="...")
         return (f"Commit {commit['hash'][:6]} ({date}, {commit['author']}) - {message}\n"
@@ -23,26 +24,37 @@ class ResponseGenerator:
             return f"Issue #{issue_num} (not found)"
 
         status = "closed" if issue['closed_at'] else "open"
-        date = datetime.fromisoformat(issue['created_at']).strftime("%b %Y")
+        created_at = issue['created_at']  # datetime from the GitHub API, ISO string when loaded from disk
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        date = created_at.strftime("%b %Y")
         comments = f"{len(issue['comments'])} comments" if issue['comments'] else ""
-        return (f"Issue #{issue_num} ({status}, {date}): {issue['title']}\n"
-                f"{textwrap.shorten(issue['body'], width=100, placeholder='...')} {comments}")
+        text = (f"Issue #{issue_num} ({status}, {date}): {issue['title']}\n"
+                f"{textwrap.shorten(issue['body'] or '', width=100, placeholder='...')} {comments}")
+
+        if self.reference_graph is not None:
+            commits = self.reference_graph.commits_of_issue(issue_num)
+            files = self.reference_graph.files_of_issue(issue_num)
+            if commits:
+                text += f"\nLinked commits: {', '.join(h[:6] for h in commits[:3])}"
+            if files:
+                text += f"\nAffected files: {', '.join(files[:3])}"
+        return text
 
     def _format_code(self, code_item: Dict) -> str:
         """Format code search result into natural language"""
+        if code_item.get('similarity') is None:  # Found by keyword (BM25) search only
+            return f"File: {code_item['file_path']}\n" \
+                   f"Contains matching identifiers or keywords"
         return f"File: {code_item['file_path']}\n" \
                f"Relevance: {code_item['similarity']:.2f} - Contains related code patterns"
 
     def _format_issue_search_result(self, issue_result: Dict) -> str: # New formatter for issue search results
         """Format issue search result from semantic search into natural language"""
-        # Issue result from semantic search is currently just index and score.
-        # We need to retrieve the actual issue data using the index.
-        issue_index = issue_result['index']
-        #  <--- Assuming you can access the original 'self.issues' list in the same order as vectors were created.
-        #  This might require you to adjust how issues and issue vectors are stored and linked.
-        if 0 <= issue_index < len(self.issues):
-            issue = self.issues[issue_index]
-            return self._format_issue(issue['number']) # Re-use _format_issue to format issue details.
+        # Search hydrates the issue record for the hit, so look it up by number
+        issue_number = issue_result['data'].get('number')
+        if issue_number is not None:
+            return self._format_issue(issue_number) # Re-use _format_issue to format issue details.
         else:
             return "Related Issue Found (details not available)" # Fallback if issue not found.
 
@@ -85,9 +97,9 @@ class ResponseGenerator:
             for code in code_files[:2]:  # Show top 2 code matches
                 response_parts.append(self._format_code(code))
 
-        # Add related issues (keyword-based from commit messages - as before)
+        # Add linked issues (reference graph: commit mentions, code files, issue-to-issue links)
         if issue_refs:
-            response_parts.append("\nRelated Issues (mentioned in commits):") # Clarify source of these issues
+            response_parts.append("\nLinked Issues:") # Reached from the results through the reference graph
             for issue_num in issue_refs[:3]:  # Show top 3 issues
                 response_parts.append(self._format_issue(issue_num))
 
@@ -105,6 +117,26 @@ class ResponseGenerator:
 
         return "\n".join(response_parts)
 
+    def generate_aggregate_response(self, answer: Dict) -> str:
+        """Format an ownership or churn answer from the precomputed history aggregates"""
+        if answer['kind'] == 'owners':
+            kind = "directory" if answer['is_directory'] else "file"
+            lines = [f"Ownership of {kind} {answer['path']} ({answer['commits']} commits, "
+                     f"last touched {answer['last_touched'].strftime('%d %b %Y')}):"]
+            lines += [f"- {author}: {count} commits" for author, count in answer['authors']]
+            return "\n".join(lines)
+
+        what = "directories" if answer['directories'] else "files"
+        lower, upper = answer['date_lower'], answer['date_upper']
+        period = (f" between {lower.strftime('%b %Y')} and {upper.strftime('%b %Y')}" if lower and upper else
+                  f" since {lower.strftime('%b %Y')}" if lower else
+                  f" until {upper.strftime('%b %Y')}" if upper else "")
+        if not answer['paths']:
+            return f"No {what} were changed{period}."
+        lines = [f"Most frequently changed {what}{period} (monthly granularity):"]
+        lines += [f"- {path}: {count} commits" for path, count in answer['paths']]
+        return "\n".join(lines)
+
     def generate_error_response(self, error: Exception) -> str:
         """Generate user-friendly error message"""
         return f"Sorry, I encountered an error: {str(error)}\n" \
@@ -1,63 +1,216 @@
-from typing import List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import os
+from typing import Callable, Iterator, List, Dict, Tuple, Union
 import pandas as pd
 import numpy as np
 
+from DataIngestion.commit_store import CommitStore
+from DataIngestion.embedding_store import EmbeddingStore
+from DataIngestion.history_aggregates import HistoryAggregates
+from DataIngestion.reference_graph import ReferenceGraph
+from Search.lexical_search import LexicalSearchEngine
 from Search.rank_fusion import RankFusion
+from Search.result_refs import ResultRef
 from Search.semantic_search import SemanticSearchEngine
 from Search.structured_query import StructuredQueryEngine
 
+# One worker per corpus (code, messages, issues); shard fan-out uses its own pool
+_corpus_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="corpus-search")
+# Pipeline stages (query encoding + semantic search) wait on corpus tasks, so they get a separate pool
+_stage_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="search-stage")
+
 
 class HybridSearchEngine:
-    def __init__(self, commit_df: pd.DataFrame, code_vectors: Dict[str, np.ndarray], message_vectors: np.ndarray, issue_vectors: Dict[str, np.ndarray] = None):
-        self.structured_engine = StructuredQueryEngine(commit_df)
-        self.semantic_engine = SemanticSearchEngine(code_vectors, message_vectors, commit_df, issue_vectors)
+    fusion_window = 50  # structured rows (newest first) handed to fusion; the full set is only used as a filter
+
+    def __init__(self, commits: Union[CommitStore, pd.DataFrame], code_vectors: Dict[str, np.ndarray], message_vectors: np.ndarray, issue_vectors: Dict[str, np.ndarray] = None,
+                 issues: List[Dict] = None, lexical_engine: LexicalSearchEngine = None, aggregates: HistoryAggregates = None,
+                 reference_graph: ReferenceGraph = None, repo_path: str = None, issue_dates: np.ndarray = None):
+        self.commit_store = CommitStore.coerce(commits)  # One compact commit table shared by both engines
+        self.structured_engine = StructuredQueryEngine(self.commit_store, aggregates)
+        self.issues = issues or []  # Row i matches issue vector i
+        self.lexical_engine = lexical_engine  # Optional BM25 side, fused as a third ranked list
+        self.reference_graph = reference_graph  # Precomputed commit <-> issue <-> file links
+        self.repo_path = repo_path  # Checkout the code vectors were read from; their file paths start with it
+        # Vectors may be raw arrays or prebuilt indexes (see from_stores)
+        self.semantic_engine = SemanticSearchEngine(code_vectors, message_vectors, self.commit_store, issue_vectors, issue_dates)
         self.rank_fusion = RankFusion()  # Initialize RankFusion with default weights and k
 
+    @classmethod
+    def from_stores(cls, commits: Union[CommitStore, pd.DataFrame], code_store: EmbeddingStore, message_store: EmbeddingStore,
+                    issue_store: EmbeddingStore = None, num_shards: int = None, issues: List[Dict] = None,
+                    lexical_engine: LexicalSearchEngine = None, aggregates: HistoryAggregates = None,
+                    reference_graph: ReferenceGraph = None, repo_path: str = None) -> "HybridSearchEngine":
+        """Build search on memory-mapped embedding stores instead of in-memory vectors"""
+        code_vectors, message_vectors, issue_vectors, issue_dates = SemanticSearchEngine.indexes_from_stores(
+            code_store, message_store, issue_store, num_shards)
+        return cls(commits, code_vectors, message_vectors, issue_vectors, issues=issues, lexical_engine=lexical_engine,
+                   aggregates=aggregates, reference_graph=reference_graph, repo_path=repo_path, issue_dates=issue_dates)
+
     def search(self, query: str, query_vec: np.ndarray, search_params: dict = None, top_k: int = 10) -> List[Dict]:
         if search_params is None:
             search_params = {}
 
-        structured_results = self.structured_engine.search_commits(query)
-        semantic_code = self.semantic_engine.semantic_code_search(query_vec) # Corrected method name
-        semantic_messages = self.semantic_engine.semantic_commit_message_search(query_vec) # Corrected method name
-        semantic_issues = self.semantic_engine.semantic_issue_search(query_vec) if self.semantic_engine.issue_vectors is not None else [] # Corrected method name
+        constraints, structured_rows, allowed = self._structured_stage(query)
+        semantic_refs = self._semantic_stage(query_vec, allowed)
+
+        # Exact identifier / error-string matches, no model inference needed
+        lexical_refs = self.lexical_engine.search(query, allowed=allowed) if self.lexical_engine is not None else []
+
+        return self._fuse(structured_rows, semantic_refs, lexical_refs, search_params, top_k)
+
+    def search_progressive(self, query: str, encode_query: Callable[[], np.ndarray], search_params: dict = None,
+                           top_k: int = 10) -> Iterator[Tuple[str, List[Dict]]]:
+        """Yield ('lexical', results) as soon as structured + BM25 hits are fused, then ('semantic', results).
+
+        Query encoding and vector search start immediately on a worker thread,
+        so the cheap stages never wait for the model.
+        """
+        if search_params is None:
+            search_params = {}
+
+        constraints, structured_rows, allowed = self._structured_stage(query)
+        semantic_future = _stage_pool.submit(lambda: self._semantic_stage(encode_query(), allowed))
+
+        lexical_refs = self.lexical_engine.search(query, allowed=allowed) if self.lexical_engine is not None else []
+        yield 'lexical', self._fuse(structured_rows, [], lexical_refs, search_params, top_k)
 
-        # Convert to List[Dict] with 'id', 'data', and 'score' keys
-        fused_structured = [{'id': res['hash'], 'data': res} for res in structured_results.to_dict('records')] # Convert DataFrame to list of dicts
-        fused_semantic_code = [{'id': res['id'], 'data': res['data'], 'score': res['score']} for res in semantic_code] # Corrected line - use keys
-        fused_semantic_messages = [{'id': res['id'], 'data': res['data'], 'score': res['score']} for res in semantic_messages] # Corrected line - use keys
-        fused_semantic_issues = [{'id': res['id'], 'data': res['data'], 'score': res['score']} for res in semantic_issues] # Corrected line - use keys
+        yield 'semantic', self._fuse(structured_rows, semantic_future.result(), lexical_refs, search_params, top_k)
 
+    def _structured_stage(self, query: str):
+        constraints = self.structured_engine.parse_constraints(query)
+        # Without constraints every commit "matches", which ranks nothing, so there is no structured list at all
+        structured_rows = self.structured_engine.search_commit_rows(query, constraints) if constraints \
+            else np.zeros(0, dtype=np.int64)
+
+        # Push the structured constraints down so vector search only ranks the allowed subset
+        allowed = self._pushdown_filters(constraints, structured_rows)
+        return constraints, structured_rows, allowed
+
+    def _semantic_stage(self, query_vec: np.ndarray, allowed: Dict[str, np.ndarray]) -> List[ResultRef]:
+        # The three corpora are independent, so search them concurrently (each may fan out to shards too)
+        code_future = _corpus_pool.submit(self.semantic_engine.semantic_code_search, query_vec, allowed=allowed['code'])
+        message_future = _corpus_pool.submit(self.semantic_engine.semantic_commit_message_search, query_vec, allowed=allowed['messages'])
+        issue_future = _corpus_pool.submit(self.semantic_engine.semantic_issue_search, query_vec, allowed=allowed['issues']) \
+            if self.semantic_engine.issue_vectors is not None else None
+        semantic_code = code_future.result()
+        semantic_messages = message_future.result()
+        semantic_issues = issue_future.result() if issue_future is not None else []
+        return semantic_code + semantic_messages + semantic_issues
+
+    def _fuse(self, structured_rows: np.ndarray, semantic_refs: List[ResultRef], lexical_refs: List[ResultRef],
+              search_params: dict, top_k: int) -> List[Dict]:
+        # Fusion only sees lightweight (corpus, row, score) references, keyed so that the same
+        # commit found by both sides merges and chunks of one file collapse into one hit
+        window = structured_rows[:max(top_k, self.fusion_window)]
+        fused_structured = [{'id': ('commit', row), 'data': ResultRef('commit', row)} for row in window.tolist()]
+        fused_semantic = [{'id': self._ref_key(ref), 'data': ref, 'score': ref.score} for ref in semantic_refs]
+        fused_lexical = [{'id': self._ref_key(ref), 'data': ref, 'score': ref.score} for ref in lexical_refs]
 
         # Fuse results
         fusion_method = search_params.get('fusion_method', 'weighted')
         fused_results = self.rank_fusion.fuse_ranks(
             fused_structured,
-            fused_semantic_code + fused_semantic_messages + fused_semantic_issues,
+            fused_semantic,
             fusion_method=fusion_method,  # Keep explicit fusion_method
+            lexical_results=fused_lexical,
             **{k: v for k, v in search_params.items() if k != 'fusion_method'}  # Exclude fusion_method from kwargs
         )
 
-        print("fused_results : ",fused_results)
+        # Code relevance is the cosine similarity from vector search; BM25 scores are on another scale
+        code_similarity = {}
+        for ref in semantic_refs:
+            if ref.corpus == 'code':
+                key = self._ref_key(ref)
+                code_similarity[key] = max(ref.score, code_similarity.get(key, ref.score))
 
-        # Extract original data and limit top-k results
+        # Hydrate full records only for the final top-k
         final_results = []
         for item in fused_results[:top_k]:
+            ref = item['data']
+            record = self.hydrate(ref)
+            if ref.corpus == 'code':
+                record['similarity'] = code_similarity.get(self._ref_key(ref))  # None for lexical-only hits
             final_results.append({
-                'type': self._get_result_type(item['data']),  # Determine type based on data
-                'data': item['data'],
-                'fusion_score': item['fusion_score'],  # Use the final fused score
+                'type': ref.corpus,
+                'ref': ref,  # Keeps the row id, so graph lookups need no reverse mapping
+                'data': record,
+                'fusion_score': item.get('fusion_score', item.get('score')),  # Weighted fusion reports 'score'
                 'sources': item.get('sources', []) # Include source information
             })
 
         return final_results
 
-    def _get_result_type(self, data: Dict) -> str:
-        """Helper function to determine result type based on data."""
-        if 'hash' in data and 'message' in data:  # Check if both 'hash' and 'message' are present
-            return 'commit'
-        elif 'file_path' in data:
-            return 'code'
-        elif 'number' in data:
-            return 'issue'
-        return 'unknown'  # Default if type cannot be determined
\ No newline at end of file
+    def _ref_key(self, ref: ResultRef) -> Tuple:
+        if ref.corpus == 'code':
+            return ('code', self.semantic_engine.code_vectors['file_paths'][ref.row])
+        return (ref.corpus, ref.row)
+
+    def hydrate(self, ref: ResultRef) -> Dict:
+        """Build the record for one reference from the columnar commit table, code ids or issue list"""
+        if ref.corpus == 'commit':
+            return self.commit_store.row(ref.row)
+        if ref.corpus == 'code':
+            return {'file_path': self.semantic_engine.code_vectors['file_paths'][ref.row], 'similarity': ref.score}
+        if ref.corpus == 'issue' and 0 <= ref.row < len(self.issues):
+            return self.issues[ref.row]
+        return {}
+
+    def linked_issues(self, search_results: List[Dict], limit: int = 3) -> List[int]:
+        """Issue numbers one hop away from the results in the reference graph, in result order.
+
+        Commits give the issues they mention or fix, code files the issues that
+        name or changed them, and issues the issues they reference. Issues that
+        are already results themselves are left out.
+        """
+        graph = self.reference_graph
+        if graph is None:
+            return []
+        shown = {result['data'].get('number') for result in search_results if result['type'] == 'issue'}
+        linked = []
+        for result in search_results:
+            data = result['data']
+            if result['type'] == 'commit':
+                numbers = graph.issues_of_commit(result['ref'].row)
+            elif result['type'] == 'code':
+                numbers = graph.issues_of_files(self._history_path_ids(data.get('file_path', '')))
+            elif result['type'] == 'issue':
+                numbers = graph.linked_issues_of_issue(data.get('number'))
+            else:
+                numbers = []
+            for number in numbers:
+                if number not in shown and number not in linked:
+                    linked.append(number)
+                    if len(linked) == limit:
+                        return linked
+        return linked
+
+    def _history_path_ids(self, file_path: str) -> np.ndarray:
+        """Path id of a code file in the commit history: the repo root is stripped once, then the path must match exactly"""
+        if self.repo_path and file_path:
+            file_path = os.path.relpath(file_path, self.repo_path)
+        path_id = self.commit_store.path_id(file_path) if file_path else None
+        return np.array([] if path_id is None else [path_id], dtype=np.int32)
+
+    def _pushdown_filters(self, constraints: Dict, structured_rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """Translate parsed constraints into allowed row ids per corpus (None = unfiltered)"""
+        allowed = {'code': None, 'messages': None, 'issues': None}
+        if not constraints:
+            return allowed
+
+        # Message vector i belongs to commit row i
+        allowed['messages'] = structured_rows
+
+        # Code chunks: the mentioned files, or else the files touched by the matching commits
+        if constraints.get('files'):
+            allowed['code'] = self.semantic_engine.code_rows_for_files(constraints['files'])
+        else:
+            touched = self.commit_store.paths_of_rows(structured_rows)
+            allowed['code'] = self.semantic_engine.code_rows_for_files([self.commit_store.paths[p] for p in touched])
+
+        # Issues only carry dates; file and author constraints leave them unfiltered
+        if constraints.get('date_lower') or constraints.get('date_upper'):
+            allowed['issues'] = self.semantic_engine.issue_rows_for_dates(
+                constraints.get('date_lower'), constraints.get('date_upper')
+            )
+        return allowed
@@ -0,0 +1,157 @@
+# Search/lexical_search.py
+import re
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+from Search.result_refs import ResultRef
+
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Code-aware tokens: whole identifiers plus their camelCase / snake_case parts.
+
+    'parse_commit_history' -> parse_commit_history, parse, commit, history
+    'HybridSearchEngine'   -> hybridsearchengine, hybrid, search, engine
+    """
+    tokens = []
+    for word in _WORD.findall(text or ""):
+        lowered = word.lower()
+        if len(lowered) > 1:
+            tokens.append(lowered)
+        parts = [p.lower() for piece in word.split('_') for p in _CAMEL.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if len(p) > 1)
+    return tokens
+
+
+class BM25Index:
+    """Sparse inverted index with BM25 scoring and MaxScore top-k evaluation.
+
+    Postings are CSR arrays: `offsets[t]:offsets[t+1]` slices `doc_ids` (int32)
+    and `tfs` (uint16) for term t. Each term also stores an upper bound of its
+    score contribution, which lets `search` stop admitting new candidates once
+    the remaining terms can no longer lift an unseen document into the top-k.
+    """
+
+    def __init__(self, documents: Iterable[str], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        vocab: Dict[str, int] = {}
+        term_ids, doc_ids, doc_lengths = [], [], []
+
+        for doc_id, text in enumerate(documents):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for token in tokens:
+                term_ids.append(vocab.setdefault(token, len(vocab)))
+                doc_ids.append(doc_id)
+
+        self.vocab = vocab
+        self.num_docs = len(doc_lengths)
+        self.doc_lengths = np.array(doc_lengths, dtype=np.int32)
+        avg_length = self.doc_lengths.mean() if self.num_docs else 0.0
+
+        # Collapse (term, doc) occurrences into term frequencies, grouped by term
+        pairs = np.array(term_ids, dtype=np.int64) * max(self.num_docs, 1) + np.array(doc_ids, dtype=np.int64)
+        unique_pairs, tfs = np.unique(pairs, return_counts=True)
+        posting_terms = unique_pairs // max(self.num_docs, 1)
+        self.doc_ids = (unique_pairs % max(self.num_docs, 1)).astype(np.int32)
+        self.tfs = np.minimum(tfs, np.iinfo(np.uint16).max).astype(np.uint16)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(posting_terms, minlength=len(vocab)))]).astype(np.int64)
+
+        df = np.diff(self.offsets)
+        self.idf = np.log(1 + (self.num_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.length_norm = (self.k1 * (1 - self.b + self.b * self.doc_lengths / avg_length)).astype(np.float32) \
+            if self.num_docs else np.zeros(0, dtype=np.float32)
+
+        # Per-term score upper bounds for MaxScore
+        self.max_scores = np.zeros(len(vocab), dtype=np.float32)
+        if len(self.doc_ids):
+            contributions = self._term_scores(np.repeat(np.arange(len(vocab)), df), self.doc_ids, self.tfs)
+            np.maximum.at(self.max_scores, np.repeat(np.arange(len(vocab)), df), contributions)
+
+    def _term_scores(self, term_ids: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+        tf = tfs.astype(np.float32)
+        return self.idf[term_ids] * tf * (self.k1 + 1) / (tf + self.length_norm[doc_ids])
+
+    def _postings(self, term_id: int):
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    def search(self, query: str, k: int = 5, allowed: Optional[np.ndarray] = None):
+        """Top-k (doc_ids, scores) for the query, optionally restricted to allowed doc ids"""
+        term_ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab},
+                          key=lambda t: -self.max_scores[t])
+        if not term_ids or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        allowed_mask = None
+        if allowed is not None:
+            allowed_mask = np.zeros(self.num_docs, dtype=bool)
+            allowed_mask[allowed] = True
+
+        # Remaining upper bound after each term, for the MaxScore cut-off
+        remaining = np.concatenate([np.cumsum([self.max_scores[t] for t in term_ids][::-1])[::-1][1:], [0.0]])
+        candidates = np.zeros(0, dtype=np.int64)
+        scores = np.zeros(0, dtype=np.float32)
+        threshold = 0.0
+
+        for i, term_id in enumerate(term_ids):
+            docs, tfs = self._postings(term_id)
+            if allowed_mask is not None:
+                keep = allowed_mask[docs]
+                docs, tfs = docs[keep], tfs[keep]
+            contribution = self._term_scores(np.full(len(docs), term_id), docs, tfs)
+
+            if len(candidates) >= k and self.max_scores[term_id] + remaining[i] < threshold:
+                # Non-essential term: unseen docs cannot reach the top-k any more, only update known candidates
+                pos = np.searchsorted(candidates, docs)
+                pos = np.minimum(pos, len(candidates) - 1)
+                hit = candidates[pos] == docs
+                np.add.at(scores, pos[hit], contribution[hit])
+            else:
+                # Essential term: merge its postings into the candidate set
+                merged = np.concatenate([candidates, docs.astype(np.int64)])
+                merged_scores = np.concatenate([scores, contribution])
+                candidates, inverse = np.unique(merged, return_inverse=True)
+                scores = np.zeros(len(candidates), dtype=np.float32)
+                np.add.at(scores, inverse, merged_scores)
+
+            if len(candidates) >= k:
+                threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+                # Candidates that cannot catch up with the k-th best even with every remaining term are dropped
+                alive = scores + remaining[i] >= threshold
+                candidates, scores = candidates[alive], scores[alive]
+
+        top = np.argsort(-scores, kind='stable')[:k]
+        return candidates[top], scores[top]
+
+
+class LexicalSearchEngine:
+    """BM25 indexes over commit messages, code chunks and issues, returning ResultRefs like semantic search"""
+
+    def __init__(self, commit_texts: Iterable[str], code_texts: Iterable[str], issue_texts: Iterable[str]):
+        self.commit_index = BM25Index(commit_texts)
+        self.code_index = BM25Index(code_texts)
+        self.issue_index = BM25Index(issue_texts)
+
+    @classmethod
+    def build(cls, commit_store, code_chunks: Iterable[str], issues: List[Dict]) -> "LexicalSearchEngine":
+        """Index commit messages (plus changed paths), code chunks in store row order, and issue titles/bodies"""
+        commit_texts = (commit_store.message(i) + ' ' + ' '.join(commit_store.files_of(i)) for i in range(len(commit_store)))
+        issue_texts = (f"{issue.get('title') or ''} {issue.get('body') or ''}" for issue in issues)
+        return cls(commit_texts, code_chunks, issue_texts)
+
+    @staticmethod
+    def _refs(corpus: str, doc_ids: np.ndarray, scores: np.ndarray) -> List[ResultRef]:
+        return [ResultRef(corpus, int(doc), float(score)) for doc, score in zip(doc_ids, scores)]
+
+    def search(self, query: str, top_k: int = 5, allowed: Optional[Dict[str, np.ndarray]] = None) -> List[ResultRef]:
+        """Ranked refs across the three corpora (each corpus contributes up to top_k hits)"""
+        allowed = allowed or {}
+        refs = self._refs('commit', *self.commit_index.search(query, top_k, allowed.get('messages')))
+        refs += self._refs('code', *self.code_index.search(query, top_k, allowed.get('code')))
+        refs += self._refs('issue', *self.issue_index.search(query, top_k, allowed.get('issues')))
+        return sorted(refs, key=lambda ref: -ref.score)
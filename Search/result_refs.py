@@ -0,0 +1,13 @@
+# Search/result_refs.py
+from typing import NamedTuple
+
+
+class ResultRef(NamedTuple):
+    """Compact pointer to a search hit; the record itself is only built for the final top-k.
+
+    corpus is 'commit', 'code' or 'issue' and row is the position in that
+    corpus (commit table row, code chunk row or issue row).
+    """
+    corpus: str
+    row: int
+    score: float = 1.0
@@ -1,86 +1,140 @@
 # semantic_search.py
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 import numpy as np
-import faiss
 import pandas as pd # Import pandas
 
+from DataIngestion.commit_store import CommitStore
+from DataIngestion.embedding_store import EmbeddingStore
+from Search.result_refs import ResultRef
+from Search.vector_index import MappedFlatIndex, build_index
+
 class SemanticSearchEngine:
-    def __init__(self, code_vectors: Dict[str, np.ndarray], message_vectors: np.ndarray, commit_df: pd.DataFrame, issue_vectors=None): # Add commit_df to constructor
-        self.code_vectors = self._build_faiss_index(code_vectors)
-        self.message_vectors = self._build_faiss_index_messages(message_vectors)
-        self.issue_vectors = self._build_faiss_index_issues(issue_vectors) if issue_vectors is not None else None
-        self.commit_df = commit_df # Store commit_df
+    def __init__(self, code_vectors: Dict[str, np.ndarray], message_vectors: np.ndarray, commits: Union[CommitStore, pd.DataFrame], issue_vectors=None,
+                 issue_dates: Optional[np.ndarray] = None):
+        """Vectors are raw arrays ({file_path: chunk vectors} for code) or prebuilt indexes
+        ({'index': ..., 'file_paths': [...]} for code), as `indexes_from_stores` returns them"""
+        self.dimension = self._infer_dimension(code_vectors, message_vectors)
+        self.code_vectors = code_vectors if self._is_index(code_vectors.get('index')) else self._build_faiss_index(code_vectors)
+        self.message_vectors = message_vectors if self._is_index(message_vectors) else self._build_faiss_index_messages(message_vectors)
+        if issue_vectors is not None and not self._is_index(issue_vectors):
+            issue_vectors = self._build_faiss_index_issues(issue_vectors)
+        self.issue_vectors = issue_vectors
+        self.issue_dates = issue_dates # Only known when built from an issue store
+        self.commit_store = CommitStore.coerce(commits) # Row i = message vector i
+        self._code_rows_by_name = None
+
+    @classmethod
+    def from_stores(cls, code_store: EmbeddingStore, message_store: EmbeddingStore, commits: Union[CommitStore, pd.DataFrame],
+                    issue_store: Optional[EmbeddingStore] = None, num_shards: Optional[int] = None) -> "SemanticSearchEngine":
+        """Build the engine straight on top of memory-mapped embedding stores (no vector copies)"""
+        code_vectors, message_vectors, issue_vectors, issue_dates = cls.indexes_from_stores(code_store, message_store, issue_store, num_shards)
+        return cls(code_vectors, message_vectors, commits, issue_vectors, issue_dates)
+
+    @classmethod
+    def indexes_from_stores(cls, code_store: EmbeddingStore, message_store: EmbeddingStore,
+                            issue_store: Optional[EmbeddingStore] = None, num_shards: Optional[int] = None):
+        """(code_vectors, message_vectors, issue_vectors, issue_dates) as indexes over the memory maps.
+
+        Large corpora are sharded by row range (num_shards=None picks a count from
+        corpus size and cores), so every shard is a view into the memory map. Code
+        is written file by file in sorted path order, so a range shard already
+        keeps directories together; commit messages and issues follow history order.
+        """
+        code_vectors = {'index': build_index(code_store.vectors(), num_shards, 'range'), 'file_paths': code_store.ids()}
+        message_vectors = build_index(message_store.vectors(), num_shards, 'range')
+        if issue_store is None or not len(issue_store):
+            return code_vectors, message_vectors, None, None
+        return (code_vectors, message_vectors, build_index(issue_store.vectors(), num_shards, 'range'),
+                cls._issue_dates(issue_store.metadata()))
+
+    @staticmethod
+    def _is_index(vectors) -> bool:
+        return hasattr(vectors, 'search')
+
+    @staticmethod
+    def _issue_dates(issue_metadata: List[Dict]) -> np.ndarray:
+        """Naive UTC creation dates per issue row, used for date filters"""
+        dates = pd.to_datetime([m.get('created_at') for m in issue_metadata], utc=True, errors='coerce')
+        return dates.tz_localize(None).to_numpy()
+
+    def code_rows_for_files(self, file_mentions: List[str]) -> np.ndarray:
+        """Chunk row ids of code files matching any mention (full repo path or trailing part)"""
+        if self._code_rows_by_name is None:
+            # basename -> {path: rows}; one entry per file, candidates are checked against the full mention
+            rows_by_name = {}
+            for row, path in enumerate(self.code_vectors['file_paths']):
+                path = path.replace('\\', '/')
+                rows_by_name.setdefault(path.rsplit('/', 1)[-1], {}).setdefault(path, []).append(row)
+            self._code_rows_by_name = rows_by_name
+
+        rows = set()
+        for mention in file_mentions:
+            mention = mention.replace('\\', '/')
+            for path, path_rows in self._code_rows_by_name.get(mention.rsplit('/', 1)[-1], {}).items():
+                if path == mention or path.endswith('/' + mention):
+                    rows.update(path_rows)
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def issue_rows_for_dates(self, date_lower=None, date_upper=None) -> Optional[np.ndarray]:
+        """Issue row ids created inside the date range, or None if dates are unknown"""
+        if self.issue_dates is None:
+            return None
+        mask = np.ones(len(self.issue_dates), dtype=bool)
+        if date_lower:
+            mask &= self.issue_dates >= np.datetime64(date_lower)
+        if date_upper:
+            mask &= self.issue_dates <= np.datetime64(date_upper)
+        return np.flatnonzero(mask)
+
+    def _infer_dimension(self, code_vectors: Dict[str, np.ndarray], message_vectors: np.ndarray) -> int:
+        """Dimension depends on the embedding backend, so read it off the vectors"""
+        if self._is_index(message_vectors):
+            return message_vectors.d
+        if message_vectors is not None and message_vectors.ndim == 2 and message_vectors.shape[1]:
+            return message_vectors.shape[1]
+        for vectors in code_vectors.values():
+            if len(vectors):
+                return np.asarray(vectors).shape[-1]
+        return 768
 
     def _build_faiss_index(self, code_vectors: Dict[str, np.ndarray]):
-        index = faiss.IndexFlatIP(768)
         file_paths = []
-        all_vectors = []
         for file_path, vectors in code_vectors.items():
-            for vector_chunk in vectors:
-                all_vectors.append(vector_chunk)
-                file_paths.append(file_path)
+            file_paths.extend([file_path] * len(vectors))
 
-        if all_vectors:
-            index.add(np.array(all_vectors))
-        return {'index': index, 'file_paths': file_paths}
+        # One concatenate into a single matrix instead of a per-chunk append loop
+        chunks = [np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension) for vectors in code_vectors.values()]
+        all_vectors = np.concatenate(chunks) if chunks else np.zeros((0, self.dimension), dtype=np.float32)
+        return {'index': MappedFlatIndex(all_vectors), 'file_paths': file_paths}
 
     def _build_faiss_index_messages(self, message_vectors: np.ndarray):
-        index = faiss.IndexFlatIP(768)
-        if message_vectors.size > 0:
-            index.add(message_vectors)
-        return index
+        if message_vectors.size == 0:
+            message_vectors = np.zeros((0, self.dimension), dtype=np.float32)
+        return MappedFlatIndex(message_vectors)
 
     def _build_faiss_index_issues(self, issue_vectors):
-        index = faiss.IndexFlatIP(768)
-        if issue_vectors is not None and len(issue_vectors) > 0:
-            index.add(np.array(issue_vectors))
-        return index
+        if issue_vectors is None or len(issue_vectors) == 0:
+            return MappedFlatIndex(np.zeros((0, self.dimension), dtype=np.float32))
+        return MappedFlatIndex(np.asarray(issue_vectors, dtype=np.float32))
 
-    def semantic_code_search(self, query_vector: np.ndarray, top_k=5) -> List[Dict]:
+    def semantic_code_search(self, query_vector: np.ndarray, top_k=5, allowed: Optional[np.ndarray] = None) -> List[ResultRef]:
         if not self.code_vectors['index'].ntotal:
             return []
 
-        D, I = self.code_vectors['index'].search(np.expand_dims(query_vector, axis=0), top_k)
-        results = []
-        for idx, score in zip(I[0], D[0]):
-            if idx != -1:
-                file_path = self.code_vectors['file_paths'][idx]
-                results.append({
-                    'id': file_path,
-                    'data': {'file_path': file_path, 'similarity': score},
-                    'score': score
-                })
-        return results
-
-    def semantic_commit_message_search(self, query_vector: np.ndarray, top_k=5) -> List[Dict]:
+        D, I = self.code_vectors['index'].search(np.expand_dims(query_vector, axis=0), top_k, allowed=allowed)
+        return [ResultRef('code', int(idx), float(score)) for idx, score in zip(I[0], D[0]) if idx != -1]
+
+    def semantic_commit_message_search(self, query_vector: np.ndarray, top_k=5, allowed: Optional[np.ndarray] = None) -> List[ResultRef]:
         if not self.message_vectors.ntotal:
             return []
 
-        D, I = self.message_vectors.search(np.expand_dims(query_vector, axis=0), top_k)
-        results = []
-        for idx, score in zip(I[0], D[0]):
-            if idx != -1:
-                # Now self.commit_df is correctly initialized and accessible
-                commit_data = self.commit_df.iloc[idx].to_dict() if hasattr(self, 'commit_df') and not self.commit_df.empty and idx < len(self.commit_df) else {}
-                results.append({
-                    'id': str(idx),
-                    'data': commit_data,
-                    'score': score
-                })
-        return results
-
-    def semantic_issue_search(self, query_vector: np.ndarray, top_k=5) -> List[Dict]:
+        # Message vector i is commit row i; records are hydrated later, only for the final results
+        D, I = self.message_vectors.search(np.expand_dims(query_vector, axis=0), top_k, allowed=allowed)
+        return [ResultRef('commit', int(idx), float(score)) for idx, score in zip(I[0], D[0]) if idx != -1]
+
+    def semantic_issue_search(self, query_vector: np.ndarray, top_k=5, allowed: Optional[np.ndarray] = None) -> List[ResultRef]:
         if self.issue_vectors is None or not self.issue_vectors.ntotal:
             return []
 
-        D, I = self.issue_vectors.search(np.expand_dims(query_vector, axis=0), top_k)
-        results = []
-        for idx, score in zip(I[0], D[0]):
-            if idx != -1:
-                issue_data = {} # Placeholder - You'll need to link back to issue data properly
-                results.append({
-                    'id': str(idx),
-                    'data': issue_data,
-                    'score': score
-                })
-        return results
\ No newline at end of file
+        D, I = self.issue_vectors.search(np.expand_dims(query_vector, axis=0), top_k, allowed=allowed)
+        return [ResultRef('issue', int(idx), float(score)) for idx, score in zip(I[0], D[0]) if idx != -1]
@@ -1,16 +1,18 @@
 # structured_query.py
+import numpy as np
 import pandas as pd
 import re
-from datetime import datetime
-from typing import List, Dict, Union
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple, Union
+
+from DataIngestion.commit_store import CommitStore
+from DataIngestion.history_aggregates import HistoryAggregates
 
 
 class StructuredQueryEngine:
-    def __init__(self, commit_df: pd.DataFrame):
-        self.df = commit_df
-        self.df['files_changed'] = self.df['files_changed'].apply(
-            lambda x: x if isinstance(x, list) else []
-        )
+    def __init__(self, commits: Union[CommitStore, pd.DataFrame], aggregates: HistoryAggregates = None):
+        self.store = CommitStore.coerce(commits)  # Shared with semantic search and the temporal linker
+        self.aggregates = aggregates  # Precomputed ownership / churn rollups, if ingestion built them
 
     def _parse_date_filter(self, query: str) -> Dict:
         """Extract date range filters from natural language query"""
@@ -27,24 +29,108 @@ class StructuredQueryEngine:
 
         return date_filters
 
-    def search_commits(self, query: str) -> pd.DataFrame:
+    def _parse_author_filter(self, query: str) -> List[str]:
+        """Extract author names mentioned as 'by <name>' or 'author:<name>' that exist in the history"""
+        # 'by' and 'author' must be whole words, so 'bytes' or 'authored' don't yield 'tes' / 'ed'
+        matches = re.findall(r"\bby\s+([\w.-]+)|\bauthor(?::\s*|\s+)([\w.-]+)", query, flags=re.IGNORECASE)
+        candidates = [by or author for by, author in matches]
+        if not candidates:
+            return []
+        return [author for author in self.store.authors
+                if any(c.lower() in str(author).lower().split() or c.lower() == str(author).lower() for c in candidates)]
+
+    def parse_constraints(self, query: str) -> Dict:
+        """Parse file, date and author constraints once so they can also be pushed into semantic search"""
+        constraints = {}
+        # File-looking tokens such as 'os.path' or 'node.js' only count when they name a path in history,
+        # otherwise they would push an empty filter into commit and code search
+        files = [f for f in re.findall(r"\b([\w/.-]*\w+\.\w{2,4})\b", query) if len(self.store.path_ids_matching([f]))]
+        if files:
+            constraints['files'] = files
+        constraints.update(self._parse_date_filter(query))
+        authors = self._parse_author_filter(query)
+        if authors:
+            constraints['authors'] = authors
+        return constraints
+
+    def commit_mask(self, constraints: Dict) -> np.ndarray:
+        """Boolean mask over commits satisfying every constraint"""
+        mask = np.ones(len(self.store), dtype=bool)
+        if constraints.get('files'):
+            # A mention matches the full repo path or any trailing part of it ('parser.py' ~ 'src/parser.py')
+            mask &= self.store.touch_mask(self.store.path_ids_matching(constraints['files']))
+        if constraints.get('date_lower') or constraints.get('date_upper'):
+            mask &= self.store.date_mask(constraints.get('date_lower'), constraints.get('date_upper'))
+        if constraints.get('authors'):
+            mask &= self.store.author_mask(constraints['authors'])
+        return mask
+
+    def allowed_commit_rows(self, constraints: Dict) -> np.ndarray:
+        """Positional row ids of matching commits (row i = message vector i)"""
+        return np.flatnonzero(self.commit_mask(constraints))
+
+    def search_commit_rows(self, query: str, constraints: Dict = None) -> np.ndarray:
+        """Positional rows of matching commits, without materializing any records"""
+        if constraints is None:
+            constraints = self.parse_constraints(query)
+        if not constraints:
+            return np.arange(len(self.store))
+        return self.allowed_commit_rows(constraints)
+
+    def search_commits(self, query: str, constraints: Dict = None) -> pd.DataFrame:
         """Execute SQL-like queries on commit history"""
-        # Extract file mentions
-        file_matches = re.findall(r"\b(\w+\.\w{2,4})\b", query)
-
-        # Build base query
-        conditions = []
-        if file_matches:
-            file_condition = " | ".join([f"'{f}' in files_changed" for f in file_matches])
-            conditions.append(f"({file_condition})")
-
-        # Add date filters
-        date_filters = self._parse_date_filter(query)
-        if date_filters.get("date_lower"):
-            conditions.append(f"date >= '{date_filters['date_lower']}'")
-        if date_filters.get("date_upper"):
-            conditions.append(f"date <= '{date_filters['date_upper']}'")
-
-        # Combine conditions
-        full_query = " & ".join(conditions) if conditions else ""
-        return self.df.query(full_query) if full_query else self.df.copy()
\ No newline at end of file
+        return self.store.to_dataframe(self.search_commit_rows(query, constraints))
+
+    def _parse_period(self, query: str, now: datetime = None) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """'this quarter', 'last month', 'this year', 'last 30 days' ... or explicit after/before dates"""
+        now = now or datetime.now()
+        quarter_start = datetime(now.year, 3 * ((now.month - 1) // 3) + 1, 1)
+        month_start = datetime(now.year, now.month, 1)
+        q = query.lower()
+        if "last quarter" in q or "previous quarter" in q:
+            start = (quarter_start - timedelta(days=1)).replace(day=1)
+            return datetime(start.year, 3 * ((start.month - 1) // 3) + 1, 1), quarter_start - timedelta(seconds=1)
+        if "this quarter" in q:
+            return quarter_start, now
+        if "last month" in q or "previous month" in q:
+            return (month_start - timedelta(days=1)).replace(day=1), month_start - timedelta(seconds=1)
+        if "this month" in q:
+            return month_start, now
+        if "last year" in q or "previous year" in q:
+            return datetime(now.year - 1, 1, 1), datetime(now.year, 1, 1) - timedelta(seconds=1)
+        if "this year" in q:
+            return datetime(now.year, 1, 1), now
+        recent = re.search(r"\b(?:last|past)\s+(\d+)\s+(day|week|month)s?\b", q)
+        if recent:
+            days = int(recent.group(1)) * {'day': 1, 'week': 7, 'month': 30}[recent.group(2)]
+            return now - timedelta(days=days), now
+        dates = self._parse_date_filter(query)
+        return dates.get("date_lower"), dates.get("date_upper")
+
+    def parse_aggregate_query(self, query: str) -> Optional[Dict]:
+        """Recognise ownership ('who owns Search/') and churn ('which files churn most this quarter') questions"""
+        owner = re.search(r"\b(?:who\s+(?:owns|maintains|knows|works\s+on|wrote)|owners?\s+of|experts?\s+(?:on|for))"
+                          r"\s+(?:the\s+)?[`'\"]?([\w./-]*[\w/])", query, flags=re.IGNORECASE)
+        if owner:
+            return {'kind': 'owners', 'path': owner.group(1)}
+
+        churn = re.search(r"\b(?:churn\w*|hotspots?|(?:changed?|modified|touched|edited)\s+(?:the\s+)?most|"
+                          r"most\s+(?:changed|modified|touched|edited|active))\b", query, flags=re.IGNORECASE)
+        if churn:
+            lower, upper = self._parse_period(query)
+            directories = re.search(r"\b(?:director(?:y|ies)|dirs?|folders?|modules?|packages?)\b", query, flags=re.IGNORECASE)
+            return {'kind': 'churn', 'directories': bool(directories), 'date_lower': lower, 'date_upper': upper}
+        return None
+
+    def aggregate_query(self, query: str) -> Optional[Dict]:
+        """Answer ownership / churn questions straight from the precomputed aggregates (None = not such a question)"""
+        if self.aggregates is None:
+            return None
+        parsed = self.parse_aggregate_query(query)
+        if parsed is None:
+            return None
+        if parsed['kind'] == 'owners':
+            answer = self.aggregates.owners(parsed['path'])
+            return dict(parsed, **answer) if answer else None  # Not a known path, leave it to regular search
+        parsed['paths'] = self.aggregates.top_churn(parsed['date_lower'], parsed['date_upper'], parsed['directories'])
+        return parsed
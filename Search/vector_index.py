@@ -0,0 +1,197 @@
+# Search/vector_index.py
+import heapq
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+import numpy as np
+import faiss
+
+# Shard fan-out pool. faiss.knn releases the GIL, so threads scale with cores.
+_shard_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="shard-search")
+
+
+class MappedFlatIndex:
+    """Exact inner-product index that searches a matrix in place.
+
+    `faiss.IndexFlatIP` copies every vector into its own buffer; this wrapper
+    instead runs `faiss.knn` directly over the given matrix, which may be a
+    read-only memory map from an EmbeddingStore. Building it costs nothing and
+    the vectors are never duplicated in process memory.
+    """
+
+    gather_ratio = 0.25  # allowed subsets up to this fraction are copied out and scanned directly
+
+    def __init__(self, vectors: np.ndarray):
+        if vectors.ndim != 2:
+            raise ValueError(f"Expected a 2-D matrix, got shape {vectors.shape}")
+        if vectors.dtype != np.float32 or not vectors.flags['C_CONTIGUOUS']:
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)  # only legacy in-memory inputs hit this
+        self.vectors = vectors
+        self.d = vectors.shape[1]
+
+    @property
+    def ntotal(self) -> int:
+        return self.vectors.shape[0]
+
+    def search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None):
+        """Same contract as faiss.Index.search: (scores, ids) padded with -1.
+
+        `allowed` restricts the search to a subset of row ids. Small subsets
+        are gathered and scanned exactly; large ones use a bitmap filter over a
+        candidate list whose size is doubled until k allowed rows are found.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if allowed is not None:
+            return self._filtered_search(queries, k, np.asarray(allowed, dtype=np.int64))
+        if self.ntotal == 0:
+            return self._empty(len(queries), k)
+        D, I = faiss.knn(queries, self.vectors, min(k, self.ntotal), metric=faiss.METRIC_INNER_PRODUCT)
+        return self._pad(D, I, k)
+
+    def _filtered_search(self, queries: np.ndarray, k: int, allowed: np.ndarray):
+        if len(allowed) == 0 or self.ntotal == 0:
+            return self._empty(len(queries), k)
+
+        if len(allowed) <= self.ntotal * self.gather_ratio:
+            # Only the allowed rows are read, so the cost scales with the subset
+            D, I = faiss.knn(queries, np.ascontiguousarray(self.vectors[allowed]), min(k, len(allowed)),
+                             metric=faiss.METRIC_INNER_PRODUCT)
+            return self._pad(D, np.where(I >= 0, allowed[I], -1), k)
+
+        bitmap = np.zeros(self.ntotal, dtype=bool)
+        bitmap[allowed] = True
+        candidates = min(self.ntotal, max(k * 2, int(np.ceil(k * self.ntotal / len(allowed)))))
+        while True:
+            D, I = faiss.knn(queries, self.vectors, candidates, metric=faiss.METRIC_INNER_PRODUCT)
+            keep = (I >= 0) & bitmap[np.clip(I, 0, None)]
+            if candidates >= self.ntotal or keep.sum(axis=1).min() >= k:
+                break
+            candidates = min(self.ntotal, candidates * 2)
+
+        out_D, out_I = self._empty(len(queries), k)
+        for row in range(len(queries)):
+            hits = np.flatnonzero(keep[row])[:k]
+            out_D[row, :len(hits)] = D[row, hits]
+            out_I[row, :len(hits)] = I[row, hits]
+        return out_D, out_I
+
+    @staticmethod
+    def _empty(n: int, k: int):
+        return (np.full((n, k), -np.inf, dtype=np.float32),
+                np.full((n, k), -1, dtype=np.int64))
+
+    def _pad(self, D: np.ndarray, I: np.ndarray, k: int):
+        if D.shape[1] < k:
+            pad = k - D.shape[1]
+            D = np.pad(D, ((0, 0), (0, pad)), constant_values=-np.inf)
+            I = np.pad(I, ((0, 0), (0, pad)), constant_values=-1)
+        return D, I
+
+
+class ShardedIndex:
+    """Splits one corpus into shards that are searched in parallel.
+
+    Strategies:
+        'range' - contiguous row blocks. Views into the backing matrix, so no
+                  copies; commits are stored in history order, which makes
+                  this a time-range split for commit messages.
+        'hash'  - rows grouped by crc32(shard_key(id)), e.g. the directory of a
+                  file path so a directory always lands in one shard. Each
+                  shard gathers its rows into its own contiguous matrix, i.e.
+                  a private copy of the memory map; prefer 'range' for stores
+                  written in the desired grouping order.
+
+    A query fans out to every shard and the per-shard top-k lists are k-way
+    merged. Shards keep their global row ids, so any one of them can be
+    rebuilt with `rebuild_shard` without touching the others.
+    """
+
+    def __init__(self, vectors: np.ndarray, num_shards: int, strategy: str = 'range',
+                 ids: Optional[List[str]] = None, shard_key: Optional[Callable[[str], str]] = None):
+        if strategy not in ('range', 'hash'):
+            raise ValueError(f"Unknown sharding strategy: {strategy}")
+        if strategy == 'hash' and ids is None:
+            raise ValueError("Hash sharding needs the row ids")
+        self.vectors = vectors
+        self.num_shards = max(1, num_shards)
+        self.strategy = strategy
+        self.ids = ids
+        self.shard_key = shard_key or (lambda row_id: row_id)
+        self.d = vectors.shape[1]
+        # Range bounds are fixed once so rebuilding one shard never moves rows between shards
+        self.bounds = np.linspace(0, self.ntotal, self.num_shards + 1).astype(np.int64)
+        self.shards = [self._build_shard(i) for i in range(self.num_shards)]
+
+    @property
+    def ntotal(self) -> int:
+        return self.vectors.shape[0]
+
+    def _shard_rows(self, shard_id: int) -> np.ndarray:
+        n = self.ntotal
+        if self.strategy == 'range':
+            return np.arange(self.bounds[shard_id], self.bounds[shard_id + 1], dtype=np.int64)
+        buckets = np.fromiter((zlib.crc32(self.shard_key(row_id).encode()) % self.num_shards for row_id in self.ids[:n]),
+                              dtype=np.int64, count=n)
+        return np.flatnonzero(buckets == shard_id)
+
+    def _build_shard(self, shard_id: int):
+        rows = self._shard_rows(shard_id)
+        if self.strategy == 'range':
+            matrix = self.vectors[rows[0]:rows[-1] + 1] if len(rows) else self.vectors[:0]
+        else:
+            matrix = self.vectors[rows]
+        return {'rows': rows, 'index': MappedFlatIndex(matrix)}
+
+    def rebuild_shard(self, shard_id: int, vectors: Optional[np.ndarray] = None, ids: Optional[List[str]] = None) -> None:
+        """Rebuild one shard, optionally against a newer (e.g. appended-to) backing matrix.
+
+        With range sharding, rows appended to the matrix belong to the last shard.
+        """
+        if vectors is not None:
+            self.vectors = vectors
+            self.bounds[-1] = self.ntotal
+        if ids is not None:
+            self.ids = ids
+        self.shards[shard_id] = self._build_shard(shard_id)
+
+    def _search_shard(self, shard, queries: np.ndarray, k: int, allowed: Optional[np.ndarray]):
+        rows = shard['rows']
+        if len(rows) == 0:
+            return MappedFlatIndex._empty(len(queries), k)
+        local_allowed = None
+        if allowed is not None:
+            # Global row ids -> positions inside this shard (rows are sorted)
+            local_allowed = np.searchsorted(rows, allowed[np.isin(allowed, rows)])
+            if len(local_allowed) == 0:
+                return MappedFlatIndex._empty(len(queries), k)
+        D, I = shard['index'].search(queries, k, allowed=local_allowed)
+        return D, np.where(I >= 0, rows[np.clip(I, 0, None)], -1)
+
+    def search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None):
+        """Fan out to all shards, then k-way merge the per-shard top-k lists"""
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if allowed is not None:
+            allowed = np.unique(np.asarray(allowed, dtype=np.int64))
+        parts = list(_shard_pool.map(lambda shard: self._search_shard(shard, queries, k, allowed), self.shards))
+
+        out_D, out_I = MappedFlatIndex._empty(len(queries), k)
+        for q in range(len(queries)):
+            # Each shard list is already sorted by descending score
+            merged = heapq.merge(*[zip(-D[q], I[q]) for D, I in parts])
+            for j, (neg_score, row) in enumerate(r for r in merged if r[1] >= 0):
+                if j == k:
+                    break
+                out_D[q, j], out_I[q, j] = -neg_score, row
+        return out_D, out_I
+
+
+def build_index(vectors: np.ndarray, num_shards: Optional[int] = None, strategy: str = 'range',
+                ids: Optional[List[str]] = None, shard_key: Optional[Callable[[str], str]] = None,
+                min_shard_rows: int = 50_000):
+    """Flat index for small corpora, sharded index once there are enough rows to split across cores"""
+    if num_shards is None:
+        num_shards = min(os.cpu_count() or 1, vectors.shape[0] // min_shard_rows)
+    if num_shards <= 1:
+        return MappedFlatIndex(vectors)
+    return ShardedIndex(vectors, num_shards, strategy, ids=ids, shard_key=shard_key)
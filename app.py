@@ -4,30 +4,52 @@ import os
 from DataIngestion.code_message_vectorizer import CodeMessageVectorizer
 from DataIngestion.issue_tracker_api import IssueTrackerAPI
 from DataIngestion.git_parser_history import GitHistoryParser
+from DataIngestion.commit_store import CommitStore
+from DataIngestion.embedding_store import EmbeddingStore
+from DataIngestion.history_aggregates import HistoryAggregates
+from DataIngestion.reference_graph import ReferenceGraph
+from DataIngestion.refresh_service import GenerationHandle, IndexGeneration, RefreshService
 import github
 import git
 from Search import HybridSearchEngine
+from Search.lexical_search import LexicalSearchEngine
 from Memory import MemoryModule
+from Memory.conversation_history import ConversationHistory
 from ResponseGenerator import ResponseGenerator
-from typing import List, Dict
-import re
+from typing import List, Dict, Optional
+import itertools
 import os
 import shutil
 import stat
+from concurrent.futures import ThreadPoolExecutor
+
+# Per-query side work (memory lookups) that runs alongside search
+_pipeline_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ask-pipeline")
 
 
 class GitChatSystem:
-    def __init__(self, repo_path: str = ".", github_token: str = None):
+    def __init__(self, repo_path: str = ".", github_token: str = None, index_path: str = "index_data",
+                 refresh_interval: float = 60.0, issue_refresh_interval: Optional[float] = None):
         self.repo_path = repo_path
+        self.index_path = index_path
         self.repo = None
+        self.pull_remote = False  # Only the clone made by download_repo is ever pulled in the background
         self.github_token = ""
         self.initialized = False
         self.conversation_history = []
+        self.vectorizer = None
+        self.history = None  # ConversationHistory shared by every index generation
+        self.generations = GenerationHandle()
+        self._generation_ids = itertools.count()
+        self.refresh_interval = refresh_interval
+        self.issue_refresh_interval = issue_refresh_interval
+        self.refresh_service = None
         print(f"Initialized GitChatSystem with repo_path: {repo_path} and github_token: {github_token}")
 
     def initialize_system(self, github_token: str):
         """Initialize all components with current repo state"""
         try:
+            self._stop_refresh()
             self.github_token = github_token
             print("Initializing system...")
             # DataIngestion
@@ -38,36 +60,21 @@ class GitChatSystem:
                 self.git_parser = GitHistoryParser(repo_url=self.repo_path)
                 print(f"Using repo_url: {self.repo_path} for GitHistoryParser")
 
-            self.commit_df = self.git_parser.parse_commit_history()
-            print(f"Parsed commit history: {self.commit_df}")
-
-            self.vectorizer = CodeMessageVectorizer()
-            self.code_vectors = self.vectorizer.vectorize_codebase(self.repo_path)
-            print(f"Vectorized codebase: {self.code_vectors}")
+            if self.vectorizer is None:
+                self.vectorizer = CodeMessageVectorizer()
+            self.issue_tracker = IssueTrackerAPI(self.github_token, vectorizer=self.vectorizer)
+            if self.history is None:
+                self.history = ConversationHistory("sessions")
 
-            self.message_vectors = self.vectorizer.vectorize_commit_messages(
-                self.commit_df["message"].tolist()
-            )
-            print(f"Vectorized commit messages: {self.message_vectors}")
+            # Queries already running keep the generation they started on
+            self.generations.publish(self._build_generation(None, refresh_issues=True))
 
-            self.issue_tracker = IssueTrackerAPI(self.github_token)
-            repo_name = self._extract_repo_name()
-            print(f"Extracted repo name: {repo_name}")
-            self.issues = self.issue_tracker.fetch_repo_issues(repo_name)
-            print(f"Fetched repo issues: {self.issues}")
-            issue_vectors_for_search = [issue['vector'] for issue in self.issues] if self.issues else None
-            print(f"Issue vectors for search: {issue_vectors_for_search}")
-
-            # Search Engine
-            self.search_engine = HybridSearchEngine(
-                self.commit_df, self.code_vectors, self.message_vectors, issue_vectors=issue_vectors_for_search
+            # Pick up new commits (and optionally issues) in the background from now on
+            self.refresh_service = RefreshService(
+                self.git_parser.repo, self.generations, self._build_generation,
+                interval=self.refresh_interval, pull_remote=self.pull_remote, issue_interval=self.issue_refresh_interval
             )
-            print("Initialized HybridSearchEngine")
-
-            # Memory and Response
-            self.memory = MemoryModule(self.commit_df)
-            self.response_gen = ResponseGenerator(self.issues)
-            print("Initialized MemoryModule and ResponseGenerator")
+            self.refresh_service.start()
 
             self.initialized = True
             print("System initialized successfully!")
@@ -76,9 +83,125 @@ class GitChatSystem:
             print(f"Initialization failed: {str(e)}")
             return f"Initialization failed: {str(e)}"
 
+    def _parse_commits(self, previous: Optional[IndexGeneration]) -> CommitStore:
+        """Parse only the commits added since the previous generation when history was not rewritten"""
+        repo = self.git_parser.repo
+        head = repo.head.commit.hexsha
+        if previous is not None and len(previous.commit_store):
+            old_head = previous.commit_store.hash(0)  # iter_commits lists newest first
+            if old_head == head:
+                return previous.commit_store  # Never mutated, so generations can share it
+            if repo.is_ancestor(old_head, head):
+                new_commits = self.git_parser.parse_commit_store(f"{old_head}..{head}")
+                print(f"Parsed {len(new_commits)} new commits")
+                return CommitStore.concat(new_commits, previous.commit_store)
+        return self.git_parser.parse_commit_store()
+
+    @staticmethod
+    def _new_commit_count(commit_store: CommitStore, previous: Optional[IndexGeneration]) -> Optional[int]:
+        """Number of commits prepended to the previous history, or None when it has to be rebuilt"""
+        if previous is None or previous.commit_store is None:
+            return None
+        if commit_store is previous.commit_store:
+            return 0
+        num_new = len(commit_store) - len(previous.commit_store)
+        if num_new > 0 and len(previous.commit_store) and commit_store.hash(num_new) == previous.commit_store.hash(0):
+            return num_new
+        return None
+
+    def _build_aggregates(self, commit_store: CommitStore, previous: Optional[IndexGeneration]) -> HistoryAggregates:
+        """Fold only the new commits into the previous aggregates when the old history is a suffix of this one"""
+        num_new = self._new_commit_count(commit_store, previous)
+        if num_new is not None and previous.aggregates is not None:
+            return previous.aggregates if num_new == 0 else HistoryAggregates.extend(previous.aggregates, commit_store, num_new)
+        return HistoryAggregates.build(commit_store)
+
+    def _build_reference_graph(self, commit_store: CommitStore, issues: List[Dict],
+                               previous: Optional[IndexGeneration]) -> ReferenceGraph:
+        """Reuse the previous graph when nothing changed, otherwise only scan the new commit messages"""
+        num_new = self._new_commit_count(commit_store, previous)
+        if num_new is not None and previous.reference_graph is not None:
+            if num_new == 0 and issues is previous.issues:
+                return previous.reference_graph
+            return ReferenceGraph.build(commit_store, issues, previous.reference_graph, num_new)
+        return ReferenceGraph.build(commit_store, issues)
+
+    def _build_generation(self, previous: Optional[IndexGeneration], refresh_issues: bool = False) -> IndexGeneration:
+        """Build a complete, self-contained set of indexes next to the live one"""
+        generation_id = next(self._generation_ids)
+        path = os.path.join(self.index_path, f"gen-{generation_id}")
+        try:
+            return self._build_generation_at(generation_id, path, previous, refresh_issues)
+        except BaseException:
+            # Never published, so nothing reads it; without this every failed retry leaves another full copy on disk
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+
+    def _build_generation_at(self, generation_id: int, path: str, previous: Optional[IndexGeneration],
+                             refresh_issues: bool) -> IndexGeneration:
+        ref_state = RefreshService.snapshot_refs(self.git_parser.repo)
+        print(f"Building index generation {generation_id}...")
+
+        commit_store = self._parse_commits(previous)
+        print(f"Parsed commit history: {len(commit_store)} commits")
+
+        aggregates = self._build_aggregates(commit_store, previous)
+        print(f"Built ownership/churn aggregates for {len(aggregates.authors)} paths")
+
+        previous_store = lambda name: EmbeddingStore(os.path.join(previous.path, name)) if previous is not None else None
+        code_store = self.vectorizer.vectorize_codebase_to_store(
+            self.repo_path, os.path.join(path, "code"), previous=previous_store("code")
+        )
+        print(f"Vectorized codebase: {len(code_store)} chunks")
+
+        message_store = self.vectorizer.vectorize_commit_messages_to_store(
+            commit_store.hash_list(), commit_store.message_list(), os.path.join(path, "messages"),
+            previous=previous_store("messages")
+        )
+        print(f"Vectorized commit messages: {len(message_store)}")
+
+        if refresh_issues or previous is None:
+            repo_name = self._extract_repo_name()
+            print(f"Extracted repo name: {repo_name}")
+            issues = self.issue_tracker.fetch_repo_issues(repo_name)
+            print(f"Fetched repo issues: {len(issues)}")
+            issue_store = self.vectorizer.issues_to_store(issues, os.path.join(path, "issues"))
+        else:
+            issues = previous.issues
+            shutil.copytree(os.path.join(previous.path, "issues"), os.path.join(path, "issues"))
+            issue_store = EmbeddingStore(os.path.join(path, "issues"))
+
+        reference_graph = self._build_reference_graph(commit_store, issues, previous)
+        print(f"Built reference graph: {len(reference_graph.commit_issues.targets)} commit-issue links")
+
+        lexical_engine = LexicalSearchEngine.build(commit_store, self.vectorizer.iter_code_chunks(code_store), issues)
+        print("Built BM25 lexical indexes")
+
+        # Search Engine (reads the memory-mapped stores in place)
+        search_engine = HybridSearchEngine.from_stores(
+            commit_store, code_store, message_store, issue_store=issue_store, issues=issues, lexical_engine=lexical_engine,
+            aggregates=aggregates, reference_graph=reference_graph, repo_path=self.repo_path
+        )
+        print("Initialized HybridSearchEngine")
+
+        # Memory and Response
+        memory = MemoryModule(commit_store, history=self.history)
+        response_gen = ResponseGenerator(issues, reference_graph)
+        print("Initialized MemoryModule and ResponseGenerator")
+
+        return IndexGeneration(generation_id, path, commit_store, issues, search_engine, memory, response_gen, ref_state,
+                               aggregates=aggregates, reference_graph=reference_graph)
+
+    def _stop_refresh(self):
+        if self.refresh_service is not None:
+            self.refresh_service.stop()
+            self.refresh_service = None
+
     def download_repo(self, repo_url: str):
         """Download a GitHub repository to local disk"""
         print(f"Downloading repository from URL: {repo_url}")
+        self._stop_refresh()  # The watcher must not pull into a directory being replaced
+        self.pull_remote = False
         if repo_url[-4:] != ".git":
             repo_url += ".git"
 
@@ -91,6 +214,7 @@ class GitChatSystem:
 
         try:
             self.repo = git.Repo.clone_from(repo_url, "repo_directory")
+            self.pull_remote = True
             print(f"Cloned repository to repo_directory")
 
             self.repo_path = os.path.join(os.getcwd(), "repo_directory")
@@ -110,61 +234,82 @@ class GitChatSystem:
         return remote_url.replace(".git", "").split("github.com/")[-1]
 
     def ask_question(self, query: str):
-        """Main processing pipeline"""
+        """Main processing pipeline, streamed: yields (history, query box) after each stage.
+
+        Structured + BM25 hits are shown first, semantic hits and issue details
+        replace them when vector search finishes, and temporal context is added
+        last. The memory lookup and query encoding run concurrently with the
+        cheap stages.
+        """
         if not self.initialized:
             print("System not initialized!")
             #     {"role": "assistant", "content": error_response}
-            return self.conversation_history, "System not initialized!"
-        try:
-            print(f"Processing query: {query}")
-            query_vec = self.vectorizer.model.encode([query])[0]
-            print(f"Encoded query vector: {query_vec}")
-
-            search_results = self.search_engine.search(query, query_vec, search_params={
-                'fusion_method': 'reciprocal_rank',
-                'structured_weight': 0.6,
-                'semantic_weight': 0.4,
-                'top_k': 10
-            })
-            print(f"Search results: {search_results}")
-
-            temporal_context = self.memory.get_context()
-            print(f"Temporal context: {temporal_context}")
-
-            issue_refs = self._find_related_issues(search_results)
-            print(f"Related issues: {issue_refs}")
-
-            response = self.response_gen.generate_response(
-                search_results, temporal_context, issue_refs
-            )
-            print(f"Generated response: {response}")
-
-            self.memory.add_conversation(query, response)
-            print("Updated memory with new conversation")
-
-            response = str(response)
+            yield self.conversation_history, "System not initialized!"
+            return
+        # Pin the current generation; a refresh published meanwhile only affects later queries
+        with self.generations.use() as generation:
+            # Updates go to this query's own message; another query may append after it meanwhile
+            answer = {"role": "assistant", "content": "Searching..."}
             self.conversation_history.extend([
                 {"role": "user", "content": query},
-                {"role": "assistant", "content": response}
+                answer
             ])
-            print(f"Updated conversation history: {self.conversation_history}")
-
-            return self.conversation_history, ""
-        except Exception as e:
-            print(f"Error: {e}")
-            error_response = self.response_gen.generate_error_response(e)
-            self.conversation_history.append({"role": "assistant", "content": error_response})
-            return self.conversation_history, ""
-
-    def _find_related_issues(self, search_results: List[Dict]) -> List[int]:
-        """Extract issue numbers from search results"""
-        issue_numbers = set()
-        for result in search_results:
-            if result['type'] == 'commit':
-                message = result['data'].get('message', '')
-                issue_numbers.update(re.findall(r"#(\d+)", message))
-        print(f"Extracted issue numbers: {issue_numbers}")
-        return list(issue_numbers)[:3]
+            yield self.conversation_history, ""
+            try:
+                print(f"Processing query: {query}")
+                # Ownership / churn questions are answered from the precomputed aggregates, no search needed
+                aggregate = generation.search_engine.structured_engine.aggregate_query(query)
+                if aggregate is not None:
+                    print(f"Aggregate answer: {aggregate}")
+                    response = generation.response_gen.generate_aggregate_response(aggregate)
+                    answer["content"] = response
+                    yield self.conversation_history, ""
+                    generation.memory.add_conversation(query, response)
+                    return
+
+                context_future = _pipeline_pool.submit(generation.memory.get_context)
+
+                stages = generation.search_engine.search_progressive(
+                    query, lambda: self.vectorizer.model.encode([query])[0], search_params={
+                        'fusion_method': 'reciprocal_rank',
+                        'structured_weight': 0.6,
+                        'semantic_weight': 0.4,
+                        'top_k': 10
+                    })
+                search_results, issue_refs = [], []
+                for stage, search_results in stages:
+                    print(f"Search results ({stage}): {search_results}")
+                    issue_refs = self._find_related_issues(generation.search_engine, search_results)
+                    print(f"Related issues: {issue_refs}")
+                    partial = generation.response_gen.generate_response(search_results, None, issue_refs)
+                    answer["content"] = str(partial)
+                    yield self.conversation_history, ""
+
+                temporal_context = context_future.result()
+                print(f"Temporal context: {temporal_context}")
+
+                response = generation.response_gen.generate_response(
+                    search_results, temporal_context, issue_refs
+                )
+                print(f"Generated response: {response}")
+
+                response = str(response)
+                answer["content"] = response
+                yield self.conversation_history, ""
+
+                generation.memory.add_conversation(query, response)
+                print("Updated memory with new conversation")
+            except Exception as e:
+                print(f"Error: {e}")
+                error_response = generation.response_gen.generate_error_response(e)
+                answer["content"] = error_response
+                yield self.conversation_history, ""
+
+    def _find_related_issues(self, search_engine: HybridSearchEngine, search_results: List[Dict]) -> List[int]:
+        """Issue numbers linked to the results, looked up in the precomputed reference graph"""
+        issue_numbers = search_engine.linked_issues(search_results)
+        print(f"Linked issue numbers: {issue_numbers}")
+        return issue_numbers
 
 # Gradio Interface (no major changes needed right now)
 def create_interface():